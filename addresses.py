@@ -0,0 +1,10 @@
+"""IP address checks shared by settings validation and exclusion handling."""
+import ipaddress
+
+
+def is_ip(text):
+    try:
+        ipaddress.ip_address(text)
+        return True
+    except ValueError:
+        return False
@@ -1,14 +1,72 @@
 import os
 import subprocess
-import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
-import urllib.request
-import json
 import sys
+import time
+
+from command_engine import CommandEngine, CommandResult, DEFAULT_MAX_CONCURRENCY
+from status_poller import StatusPoller
+from ip_lookup import IPCache, PublicIPLookup
+import cli_parser
+import linux_introspect
+from link_watcher import LinkWatcher
+from status_probe import TieredStatusProbe
+from throughput import ThroughputMeter, decimate, format_bytes
+from quality_monitor import QualityMonitor, format_summary
+from location_model import LocationModel
+from state_snapshot import StateSnapshot
+from gui_log import LogBuffer, LogFolder, RotatingLogWriter, LEVELS, mask_secrets
+from view_state import ViewState
+import settings_tx
+import exclusion_io
+from exclusion_set import ExclusionPlan
+from exclusion_model import ExclusionModel
+from virtual_listbox import VirtualListbox
+
+# A status call that takes longer than this is killed so polling can continue
+STATUS_TIMEOUT = 15
+# Log poll latency statistics every this many polls
+STATUS_STATS_EVERY = 20
+# Polls first run cheap kernel checks, so they can back off less far
+STATUS_MAX_INTERVAL_MS = 5000
+# The CLI status is still asked at least this often, in seconds
+STATUS_MAX_STALENESS = 30
+# Item id of the informational row in the locations table
+LOCATION_PLACEHOLDER = "placeholder"
+# Delay between the last keystroke and filtering the locations
+SEARCH_DEBOUNCE_MS = 150
+# Interval between background refreshes of the location list
+LOCATION_REFRESH_MS = 5 * 60 * 1000
+# Changes to the UI state snapshot are written at most this often
+SNAPSHOT_SAVE_DELAY_MS = 1000
+# Text colour for values restored from the snapshot and not yet confirmed
+STALE_COLOR = "#999999"
+# Queued UI events and log lines are applied in batches at most this often
+UI_TICK_MS = 50
+# Lines kept in the log pane, and pending lines buffered between flushes
+LOG_MAX_LINES = 2000
+# Messages below this level are discarded unless the level is changed at runtime
+DEFAULT_LOG_LEVEL = "info"
+# The on-disk log rotates at this size, keeping this many gzip-compressed backups
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 5
+# Read-only commands run at idle time so that the other tabs open instantly
+PREFETCH_COMMANDS = (["list-locations"], ["config", "show"], ["site-exclusions", "show"], ["--version"])
+# How often the tunnel's byte counters are sampled for the throughput meter
+THROUGHPUT_SAMPLE_MS = 1000
+THROUGHPUT_GRAPH_HEIGHT = 50
+THROUGHPUT_SPANS = ("10 min", "24 h")
+RX_COLOR = "#4CAF50"
+TX_COLOR = "#2196F3"
+# Interval between rounds of connection quality probes through the tunnel
+QUALITY_PROBE_MS = 5000
+DEFAULT_SOCKS_ENDPOINT = ("127.0.0.1", 1080)
 
 class AdGuardVPNGUI:
-    def __init__(self, root):
+    def __init__(self, root, max_concurrent_commands=DEFAULT_MAX_CONCURRENCY, ip_endpoints=None,
+                 throughput_sample_ms=THROUGHPUT_SAMPLE_MS, probe_targets=None):
+        self._started_at = time.perf_counter()
         self.root = root
         self.root.title("AdGuard VPN")
         self.root.geometry("800x600")
@@ -19,23 +77,105 @@ class AdGuardVPNGUI:
         self.text_color = "#333333"
         self.root.configure(bg=self.bg_color)
         
-        # Initialize early logs storage
-        self._early_logs = []
+        # Log lines from any thread collect here until the next flush
+        self.log_buffer = LogBuffer(LOG_MAX_LINES)
+        self.log_folder = LogFolder()
+        self.log_level = LEVELS[DEFAULT_LOG_LEVEL]
+        self.log_writer = RotatingLogWriter(max_bytes=LOG_FILE_MAX_BYTES, backup_count=LOG_FILE_BACKUPS)
+        
+        # Backing fields for the connection widgets; workers post changes here
+        self.view = ViewState(
+            status_text="Status: Checking...",
+            status_color="gray",
+            ip="Not connected",
+            location="Not connected",
+            protocol="Not connected",
+            download="Not connected",
+            upload="Not connected",
+            quality="Not connected",
+            button_text="Connect",
+            button_state="normal",
+            stale=False
+        )
         
         self.find_executable()
         
+        # All CLI calls run through one bounded engine off the Tk thread
+        self.engine = CommandEngine(max_concurrent_commands)
+        self._login_prompt_pending = False
+        self.status_poller = StatusPoller(self.root, self.poll_status, max_interval=STATUS_MAX_INTERVAL_MS)
+        self.status_probe = TieredStatusProbe(self.executable, STATUS_MAX_STALENESS)
+        self._status_uncached = False
+        self.ip_cache = IPCache()
+        # Tunnel interface named by the last status, and kernel notifications about it
+        self.tunnel_interface = None
+        self.link_watcher = LinkWatcher(
+            lambda event: self.view.call(lambda: self.on_link_event(event)),
+            lambda error: self.log(f"Not watching network changes ({error}); relying on status polls", "warn")
+        )
+        self.throughput_sample_ms = throughput_sample_ms
+        self.throughput = ThroughputMeter(throughput_sample_ms / 1000)
+        self.tunnel_mode = None
+        self.quality_monitor = QualityMonitor(probe_targets)
+        self._quality_round = None
+        self.public_ip_lookup = PublicIPLookup(ip_endpoints)
+        self.snapshot = StateSnapshot()
+        self._snapshot_save_id = None
+        self._stale_widgets = {}
+        # Last configuration read from the CLI; settings are applied as a diff against it
+        self.current_settings = None
+        self.settings_transaction = None
+        # Last exclusion list read from the CLI, and the bulk import in progress
+        self.current_exclusions = None
+        self.exclusion_import = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         self.is_logged_in = False
         
         self.setup_tabs()
         
-        # Display early logs once the UI is set up
-        self.display_early_logs()
+        # Show the last known state right away; the checks below reconcile it
+        self.restore_snapshot()
+        
+        # Start applying queued UI events and buffered logs, including any from before the UI was set up
+        self.ui_tick()
+        self.sample_throughput()
+        self.probe_quality()
         
         # Add permission check
-        if not self.check_permissions():
-            self.show_permissions_warning()
+        self.check_permissions()
         
         self.check_login_status()
+        
+        self.link_watcher.start()
+        
+        # Measure time to the first interactive frame, then prefetch the other tabs' data
+        self.root.after(0, lambda: self.root.after_idle(self.on_first_frame))
+
+    def on_first_frame(self):
+        elapsed = (time.perf_counter() - self._started_at) * 1000
+        self.log(f"First interactive frame after {elapsed:.0f} ms")
+        self.prefetch_tab_data(list(PREFETCH_COMMANDS))
+
+    def prefetch_tab_data(self, commands):
+        """Warm the command cache one read at a time, only when Tk is idle"""
+        if not commands:
+            return
+        args = commands.pop(0)
+        self.log(f"Prefetching: {' '.join(args)}", "debug")
+        future = self.engine.submit([self.executable] + args)
+        future.add_done_callback(
+            lambda done: self.view.call(lambda: self.root.after_idle(lambda: self.prefetch_tab_data(commands)))
+        )
+
+    def on_close(self):
+        self.status_poller.stop()
+        self.link_watcher.stop()
+        self.save_snapshot()
+        self.engine.shutdown()
+        self.write_log_lines()
+        self.log_writer.close()
+        self.root.destroy()
 
     def find_executable(self):
         possible_locations = [
@@ -49,7 +189,7 @@ class AdGuardVPNGUI:
         # Get the current script directory when running as binary
         if getattr(sys, 'frozen', False):
             application_path = os.path.dirname(sys.executable)
-            self.log(f"Running as binary from: {application_path}")
+            self.log(f"Running as binary from: {application_path}", "debug")
             possible_locations.append(os.path.join(application_path, "adguardvpn-cli"))
         
         for location in possible_locations:
@@ -66,7 +206,7 @@ class AdGuardVPNGUI:
                 self.log(f"Found executable via 'which': {self.executable}")
                 return
         except Exception as e:
-            self.log(f"Error running 'which': {e}")
+            self.log(f"Error running 'which': {e}", "warn")
         
         self.executable = "/usr/bin/adguardvpn-cli"  # Default fallback
         self.log(f"Using default fallback path: {self.executable}")
@@ -95,39 +235,29 @@ class AdGuardVPNGUI:
                     )
 
     def check_permissions(self):
-        """Check if we have permission to run the VPN commands"""
-        self.log(f"Checking permissions for: {self.executable}")
+        """Check if we have permission to run the VPN commands, warning the user if not"""
+        self.log(f"Checking permissions for: {self.executable}", "debug")
         
         if not os.path.exists(self.executable):
-            self.log(f"Warning: Executable does not exist at: {self.executable}")
+            self.log(f"Warning: Executable does not exist at: {self.executable}", "warn")
+            self.show_permissions_warning()
             return False
         
         if not os.access(self.executable, os.X_OK):
-            self.log(f"Warning: No execution permission for: {self.executable}")
+            self.log(f"Warning: No execution permission for: {self.executable}", "warn")
+            self.show_permissions_warning()
             return False
         
         # Try to run a basic command
-        try:
-            result = subprocess.run(
-                [self.executable, "--version"],
-                capture_output=True,
-                text=True,
-                check=False,
-                timeout=5,
-                env=os.environ.copy()
-            )
-            if result.returncode == 0:
-                self.log(f"Permission check passed: {result.stdout.strip()}")
-                return True
-            else:
-                self.log(f"Permission check failed: {result.stderr}")
-                return False
-        except subprocess.TimeoutExpired:
-            self.log("Permission check timed out")
-            return False
-        except Exception as e:
-            self.log(f"Permission check error: {e}")
-            return False
+        self.run_cli_async(["--version"], self._handle_permission_check, timeout=5)
+        return True
+
+    def _handle_permission_check(self, result):
+        if result.ok:
+            self.log(f"Permission check passed: {result.stdout.strip()}", "debug")
+        else:
+            self.log(f"Permission check failed: {result.stderr}", "error")
+            self.show_permissions_warning()
 
     def show_permissions_warning(self):
         """Show a warning about permission issues"""
@@ -142,33 +272,41 @@ class AdGuardVPNGUI:
     def setup_tabs(self):
         self.tab_control = ttk.Notebook(self.root)
         
-        # Main tab
+        # Main tab is built right away; the others are built on first selection
         self.main_tab = ttk.Frame(self.tab_control)
         self.tab_control.add(self.main_tab, text="Main")
         self.setup_main_tab()
         
-        # Locations tab
         self.locations_tab = ttk.Frame(self.tab_control)
         self.tab_control.add(self.locations_tab, text="Locations")
-        self.setup_locations_tab()
         
-        # Settings tab
         self.settings_tab = ttk.Frame(self.tab_control)
         self.tab_control.add(self.settings_tab, text="Settings")
-        self.setup_settings_tab()
         
-        # Exclusions tab
         self.exclusions_tab = ttk.Frame(self.tab_control)
         self.tab_control.add(self.exclusions_tab, text="Exclusions")
-        self.setup_exclusions_tab()
         
-        # About tab
         self.about_tab = ttk.Frame(self.tab_control)
         self.tab_control.add(self.about_tab, text="About")
-        self.setup_about_tab()
+        
+        self._tab_builders = {
+            str(self.locations_tab): self.setup_locations_tab,
+            str(self.settings_tab): self.setup_settings_tab,
+            str(self.exclusions_tab): self.setup_exclusions_tab,
+            str(self.about_tab): self.setup_about_tab,
+        }
+        self.tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
         self.tab_control.pack(expand=1, fill="both")
 
+    def on_tab_changed(self, event=None):
+        """Build a tab the first time it is selected"""
+        builder = self._tab_builders.pop(self.tab_control.select(), None)
+        if builder:
+            start = time.perf_counter()
+            builder()
+            self.log(f"Built {builder.__name__} in {(time.perf_counter() - start) * 1000:.0f} ms", "debug")
+
     def setup_main_tab(self):
         main_frame = tk.Frame(self.main_tab, bg=self.bg_color)
         main_frame.pack(expand=True, fill="both", padx=20, pady=20)
@@ -235,11 +373,53 @@ class AdGuardVPNGUI:
         tk.Label(protocol_frame, text="Protocol:", width=15, anchor="w", bg=self.bg_color).pack(side="left")
         self.protocol_label = tk.Label(protocol_frame, text="Not connected", bg=self.bg_color)
         self.protocol_label.pack(side="left", fill="x", expand=True)
+        self.label_fg = self.protocol_label.cget("fg")
+        
+        # Throughput of the tunnel interface
+        download_frame = tk.Frame(self.details_frame, bg=self.bg_color)
+        download_frame.pack(fill="x", pady=5)
+        tk.Label(download_frame, text="Download:", width=15, anchor="w", bg=self.bg_color).pack(side="left")
+        self.download_label = tk.Label(download_frame, text="Not connected", fg=RX_COLOR, bg=self.bg_color)
+        self.download_label.pack(side="left")
+        
+        upload_frame = tk.Frame(self.details_frame, bg=self.bg_color)
+        upload_frame.pack(fill="x", pady=5)
+        tk.Label(upload_frame, text="Upload:", width=15, anchor="w", bg=self.bg_color).pack(side="left")
+        self.upload_label = tk.Label(upload_frame, text="Not connected", fg=TX_COLOR, bg=self.bg_color)
+        self.upload_label.pack(side="left")
+        
+        quality_frame = tk.Frame(self.details_frame, bg=self.bg_color)
+        quality_frame.pack(fill="x", pady=5)
+        tk.Label(quality_frame, text="Quality:", width=15, anchor="w", bg=self.bg_color).pack(side="left")
+        self.quality_label = tk.Label(quality_frame, text="Not connected", bg=self.bg_color)
+        self.quality_label.pack(side="left", fill="x", expand=True)
+        
+        self.throughput_span_var = tk.StringVar(value=THROUGHPUT_SPANS[0])
+        span_menu = tk.OptionMenu(upload_frame, self.throughput_span_var, *THROUGHPUT_SPANS,
+                                  command=lambda span: self.draw_throughput())
+        span_menu.config(bg=self.bg_color, relief="flat", highlightthickness=0)
+        span_menu.pack(side="right", padx=5)
+        
+        # The graph always consists of these three items; only their coordinates change
+        self.throughput_canvas = tk.Canvas(self.details_frame, height=THROUGHPUT_GRAPH_HEIGHT,
+                                           bg="white", highlightthickness=0)
+        self.throughput_canvas.pack(fill="x", padx=5, pady=5)
+        self.rx_line = self.throughput_canvas.create_line(0, 0, 0, 0, fill=RX_COLOR, state="hidden")
+        self.tx_line = self.throughput_canvas.create_line(0, 0, 0, 0, fill=TX_COLOR, state="hidden")
+        self.peak_text = self.throughput_canvas.create_text(4, 2, anchor="nw", fill="gray", font=("Arial", 8))
         
         # Log display
         log_frame = tk.LabelFrame(main_frame, text="Log", bg=self.bg_color)
         log_frame.pack(fill="both", expand=True, pady=10)
         
+        level_frame = tk.Frame(log_frame, bg=self.bg_color)
+        level_frame.pack(fill="x", padx=5)
+        tk.Label(level_frame, text="Level:", bg=self.bg_color).pack(side="left")
+        self.log_level_var = tk.StringVar(value=DEFAULT_LOG_LEVEL)
+        level_menu = tk.OptionMenu(level_frame, self.log_level_var, *LEVELS, command=self.set_log_level)
+        level_menu.config(bg=self.bg_color, relief="flat", highlightthickness=0)
+        level_menu.pack(side="left")
+        
         self.log_text = scrolledtext.ScrolledText(log_frame, height=10)
         self.log_text.pack(fill="both", expand=True, padx=5, pady=5)
         self.log_text.config(state="disabled")
@@ -253,8 +433,16 @@ class AdGuardVPNGUI:
         search_frame.pack(fill="x", pady=10)
         
         tk.Label(search_frame, text="Search:", bg=self.bg_color).pack(side="left")
-        self.search_entry = tk.Entry(search_frame, width=30)
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(search_frame, width=30, textvariable=self.search_var)
         self.search_entry.pack(side="left", padx=5)
+        self.search_entry.bind("<Return>", lambda event: self.search_locations())
+        
+        # Filter as the user types, debounced so a burst of keystrokes filters once
+        self._search_after_id = None
+        self.location_matches = None
+        self._shown_locations = None
+        self.search_var.trace_add("write", lambda *args: self.schedule_location_filter())
         
         search_button = tk.Button(
             search_frame, 
@@ -270,7 +458,7 @@ class AdGuardVPNGUI:
         refresh_button = tk.Button(
             search_frame, 
             text="Refresh List", 
-            command=self.fetch_locations,
+            command=lambda: self.fetch_locations(use_cache=False),
             bg=self.accent_color,
             fg="white",
             relief="flat",
@@ -302,11 +490,11 @@ class AdGuardVPNGUI:
         tree_scroll_y.config(command=self.location_tree.yview)
         tree_scroll_x.config(command=self.location_tree.xview)
         
-        # Define headings
-        self.location_tree.heading("iso", text="ISO", command=lambda: self.sort_locations_by_column("iso", False))
-        self.location_tree.heading("country", text="Country", command=lambda: self.sort_locations_by_column("country", False))
-        self.location_tree.heading("city", text="City", command=lambda: self.sort_locations_by_column("city", False))
-        self.location_tree.heading("ping", text="Ping", command=lambda: self.sort_locations_by_column("ping", False))
+        # Define headings; clicking a heading toggles the sort direction
+        self.location_model = LocationModel()
+        self.location_headings = {"iso": "ISO", "country": "Country", "city": "City", "ping": "Ping"}
+        for column, title in self.location_headings.items():
+            self.location_tree.heading(column, text=title, command=lambda col=column: self.sort_locations_by_column(col))
         
         # Define columns
         self.location_tree.column("iso", width=50, anchor="w")
@@ -314,6 +502,9 @@ class AdGuardVPNGUI:
         self.location_tree.column("city", width=150, anchor="w")
         self.location_tree.column("ping", width=70, anchor="e")
         
+        # Rows restored from the snapshot are greyed out until refreshed
+        self.location_tree.tag_configure("stale", foreground=STALE_COLOR)
+        
         # Pack the treeview
         self.location_tree.pack(side="left", fill="both", expand=True)
         
@@ -347,8 +538,10 @@ class AdGuardVPNGUI:
         )
         connect_fastest_button.pack(side="left", padx=5)
         
-        # Initial fetch of locations
+        # Show cached locations, fetch the current ones, then keep them fresh in the background
         self.fetch_locations()
+        self.restore_cached_locations()
+        self.root.after(LOCATION_REFRESH_MS, self.auto_refresh_locations)
 
     def setup_settings_tab(self):
         settings_frame = tk.Frame(self.settings_tab, bg=self.bg_color)
@@ -403,7 +596,7 @@ class AdGuardVPNGUI:
         tk.Radiobutton(update_frame, text="Nightly", variable=self.update_channel_var, value="nightly", bg=self.bg_color).pack(anchor="w", padx=10, pady=5)
         
         # Apply settings button
-        apply_button = tk.Button(
+        self.apply_button = tk.Button(
             settings_frame, 
             text="Apply Settings", 
             command=self.apply_settings,
@@ -412,11 +605,14 @@ class AdGuardVPNGUI:
             font=("Arial", 11),
             relief="flat",
             padx=15,
-            pady=8
+            pady=8,
+            # Enabled once `config show` has given a baseline to diff and roll back to
+            state=tk.NORMAL if self.current_settings is not None else tk.DISABLED
         )
-        apply_button.pack(pady=15)
+        self.apply_button.pack(pady=15)
         
         # Load current settings
+        self.restore_cached_settings()
         self.load_settings()
 
     def setup_exclusions_tab(self):
@@ -472,14 +668,22 @@ class AdGuardVPNGUI:
         list_frame = tk.Frame(manage_frame, bg=self.bg_color)
         list_frame.pack(fill="both", expand=True, pady=5, padx=10)
         
-        tk.Label(list_frame, text="Current Exclusions:", bg=self.bg_color).pack(anchor="w")
+        header_frame = tk.Frame(list_frame, bg=self.bg_color)
+        header_frame.pack(fill="x")
+        tk.Label(header_frame, text="Current Exclusions:", bg=self.bg_color).pack(side="left")
         
-        self.exclusions_listbox = tk.Listbox(list_frame, height=10)
-        self.exclusions_listbox.pack(side="left", fill="both", expand=True)
+        self.exclusion_search_var = tk.StringVar()
+        exclusion_search_entry = tk.Entry(header_frame, width=25, textvariable=self.exclusion_search_var)
+        exclusion_search_entry.pack(side="right")
+        tk.Label(header_frame, text="Search:", bg=self.bg_color).pack(side="right", padx=5)
+        self._exclusion_search_after_id = None
+        self.exclusion_search_var.trace_add("write", lambda *args: self.schedule_exclusion_filter())
         
-        scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=self.exclusions_listbox.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.exclusions_listbox.config(yscrollcommand=scrollbar.set)
+        # Only the visible rows are ever inserted into the listbox
+        self.exclusion_model = ExclusionModel()
+        self.exclusions_view = VirtualListbox(list_frame, self.exclusion_model, bg=self.bg_color, height=10)
+        self.exclusions_view.pack(fill="both", expand=True)
+        self.exclusions_listbox = self.exclusions_view.listbox
         
         # Buttons for exclusions management
         button_frame = tk.Frame(manage_frame, bg=self.bg_color)
@@ -507,10 +711,21 @@ class AdGuardVPNGUI:
         )
         clear_button.pack(side="left", padx=5)
         
+        optimize_button = tk.Button(
+            button_frame, 
+            text="Optimize", 
+            command=self.optimize_exclusions,
+            bg=self.accent_color,
+            fg="white",
+            relief="flat",
+            padx=10
+        )
+        optimize_button.pack(side="left", padx=5)
+        
         refresh_button = tk.Button(
             button_frame, 
             text="Refresh List", 
-            command=self.refresh_exclusions,
+            command=lambda: self.refresh_exclusions(use_cache=False),
             bg=self.accent_color,
             fg="white",
             relief="flat",
@@ -518,8 +733,31 @@ class AdGuardVPNGUI:
         )
         refresh_button.pack(side="right", padx=5)
         
+        export_button = tk.Button(
+            button_frame, 
+            text="Export...", 
+            command=self.export_exclusions,
+            bg=self.accent_color,
+            fg="white",
+            relief="flat",
+            padx=10
+        )
+        export_button.pack(side="right", padx=5)
+        
+        import_button = tk.Button(
+            button_frame, 
+            text="Import...", 
+            command=self.import_exclusions,
+            bg=self.accent_color,
+            fg="white",
+            relief="flat",
+            padx=10
+        )
+        import_button.pack(side="right", padx=5)
+        
         # Initial fetch of exclusions
         self.refresh_exclusions()
+        self.restore_cached_exclusions()
 
     def setup_about_tab(self):
         about_frame = tk.Frame(self.about_tab, bg=self.bg_color)
@@ -531,11 +769,11 @@ class AdGuardVPNGUI:
         
         tk.Label(info_frame, text="AdGuard VPN GUI", font=("Arial", 16, "bold"), bg=self.bg_color).pack()
         
-        # Get CLI version
-        version = self.run_command(["--version"]).strip()
-        version_text = f"CLI Version: {version}" if version else "CLI Version: Unknown"
-        
-        tk.Label(info_frame, text=version_text, font=("Arial", 12), bg=self.bg_color).pack(pady=5)
+        # Get CLI version in the background
+        self.cli_version_label = tk.Label(info_frame, text="CLI Version: Checking...", font=("Arial", 12), bg=self.bg_color)
+        self.cli_version_label.pack(pady=5)
+        self.restore_cached_version()
+        self.run_cli_async(["--version"], self.show_cli_version)
         tk.Label(info_frame, text="GUI Version: 1.1.0", font=("Arial", 12), bg=self.bg_color).pack(pady=5)
         
         # Show CLI path
@@ -606,6 +844,14 @@ class AdGuardVPNGUI:
         tk.Label(links_frame, text="GitHub: github.com/AdguardTeam/AdguardVPNCLI", fg="blue", cursor="hand2", bg=self.bg_color).pack(anchor="w")
         tk.Label(links_frame, text="GitHub: github.com/0xGingi/AdguardVPNGUI", fg="blue", cursor="hand2", bg=self.bg_color).pack(anchor="w")
 
+
+    def show_cli_version(self, result):
+        version = result.stdout.strip() if result.ok else ""
+        version_text = f"CLI Version: {version}" if version else "CLI Version: Unknown"
+        self.cli_version_label.config(text=version_text)
+        self.mark_fresh(self.cli_version_label)
+        if version:
+            self.remember_state("cli_version", version)
             
     def change_cli_path(self):
         selected_file = filedialog.askopenfilename(
@@ -616,6 +862,10 @@ class AdGuardVPNGUI:
         if selected_file:
             if os.access(selected_file, os.X_OK):
                 self.executable = selected_file
+                # Cached reads came from the previous executable
+                self.engine.cache.clear()
+                self.status_probe.executable = selected_file
+                self.status_probe.invalidate()
                 messagebox.showinfo("Success", f"CLI path updated to: {selected_file}")
                 
                 # Update the path display in the about tab
@@ -631,315 +881,296 @@ class AdGuardVPNGUI:
                 )
 
     # Command execution methods
-    def run_command(self, args, check_error=True):
-        """Run an AdGuardVPN CLI command synchronously and return the output"""
-        try:
-            cmd = [self.executable] + args
-            self.log(f"Running command: {' '.join(cmd)}")
-            
-            # Set environment variables that might be needed
-            env = os.environ.copy()
-            
-            # Run the command with proper environment
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True,
-                check=False,
-                env=env
-            )
-            
-            if result.stdout:
-                self.log(f"Command output: {result.stdout.strip()}")
+    def run_cli_async(self, args, callback=None, timeout=None, use_cache=True):
+        """Run an AdGuardVPN CLI command on the engine and pass its CommandResult to callback on the Tk thread.
+        
+        Pass use_cache=False when the user explicitly asked for fresh data.
+        """
+        cmd = [self.executable] + args
+        self.log(f"Running command: {mask_secrets(cmd)}", "debug")
+        future = self.engine.submit(cmd, timeout, use_cache)
+        
+        def done(future):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = CommandResult(cmd, -1, "", str(e))
+            if callback:
+                self.view.call(lambda: callback(result))
+        
+        future.add_done_callback(done)
+
+    def format_command_result(self, result, check_error=True):
+        """Turn a CommandResult into the text the UI callbacks expect"""
+        if result.stdout:
+            self.log(f"Command output: {result.stdout.strip()}", "debug")
+        
+        if check_error and result.returncode != 0:
+            error_message = f"Command error ({result.returncode}): {result.stderr.strip()}"
+            self.log(error_message, "error")
             
-            if check_error and result.returncode != 0:
-                error_message = f"Command error ({result.returncode}): {result.stderr.strip()}"
-                self.log(error_message)
-                
-                if "you must log in" in result.stderr.lower() or "you are not logged in" in result.stderr.lower():
-                    self.is_logged_in = False
-                    if messagebox.askyesno("Login Required", 
-                                          "You need to log in to use AdGuard VPN.\nWould you like to log in now?"):
-                        self.show_login_dialog()
-                
-                return error_message
+            if "you must log in" in result.stderr.lower() or "you are not logged in" in result.stderr.lower():
+                self.is_logged_in = False
+                self.view.call(self.prompt_login)
             
-            return result.stdout
-        except Exception as e:
-            error_message = f"Error executing command: {e}"
-            self.log(error_message)
             return error_message
-
-    def run_command_async(self, args, callback=None):
-        def execute():
-            try:
-                result = self.run_command(args)
-                if callback:
-                    self.root.after(0, lambda: callback(result))
-            except Exception as e:
-                self.log(f"Error executing async command: {e}")
         
-        threading.Thread(target=execute, daemon=True).start()
+        return result.stdout
+
+    def prompt_login(self):
+        """Ask the user to log in, at most one prompt at a time"""
+        if self._login_prompt_pending:
+            return
+        self._login_prompt_pending = True
+        try:
+            if messagebox.askyesno("Login Required", 
+                                  "You need to log in to use AdGuard VPN.\nWould you like to log in now?"):
+                self.show_login_dialog()
+        finally:
+            self._login_prompt_pending = False
+
+    def run_command_async(self, args, callback=None, check_error=True, timeout=None, use_cache=True):
+        """Run an AdGuardVPN CLI command without blocking and pass its output to callback"""
+        def finished(result):
+            output = self.format_command_result(result, check_error)
+            if callback:
+                callback(output)
+        
+        self.run_cli_async(args, finished, timeout, use_cache)
 
     # Main tab methods
     def update_status(self):
-        self.run_command_async(["status"], self.process_status)
+        # Polls are scheduled by the status poller, which never overlaps them
+        self.status_probe.invalidate()
+        self.status_poller.start()
+
+    def refresh_status_soon(self, boost=False):
+        """Poll with the CLI right away, and keep polling fast for a while if boost is set"""
+        self.status_probe.invalidate()
+        if boost:
+            self.status_poller.boost()
+        else:
+            self.status_poller.request_now()
+
+    def poll_status(self, done):
+        """Run one status check for the poller and report the resulting state"""
+        if not self.status_poller.boosted and not self.status_probe.needs_cli(self.tunnel_interface):
+            # Interface and daemon look just as they did at the last CLI answer
+            done(self.status_poller.last_state)
+            self.log_poll_stats()
+            return
         
-        # Schedule next update
-        self.root.after(5000, self.update_status)
+        def finished(result):
+            state = None
+            try:
+                state = self.process_status(result)
+                self.status_probe.confirmed(self.tunnel_interface)
+            finally:
+                done(state)
+                self.log_poll_stats()
+        
+        # A manual refresh asks the CLI even if a cached answer is still valid
+        use_cache = not self._status_uncached
+        self._status_uncached = False
+        self.run_command_async(["status"], finished, timeout=STATUS_TIMEOUT, use_cache=use_cache)
+
+    def log_poll_stats(self):
+        if self.status_poller.polls % STATUS_STATS_EVERY == 0:
+            self.log(f"Status poll stats: {self.status_poller.stats_summary()}", "debug")
+            self.log(f"Status probe: {self.status_probe.stats_summary()}; "
+                     f"{self.link_watcher.events} network change events", "debug")
+            self.log(f"IP cache: {self.ip_cache.stats_summary()}", "debug")
+            self.log(f"CLI read cache: {self.engine.cache.stats_summary()}; "
+                     f"{self.engine.coalesced} duplicate requests coalesced", "debug")
 
     def process_status(self, result):
-        # Strip ANSI escape codes from the result
-        import re
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        clean_result = ansi_escape.sub('', result)
+        """Update the UI from status output and return a tuple describing the connection state"""
+        status = cli_parser.parse_status(result)
         
         # Log the cleaned output for debugging
-        self.log(f"Status check result: {clean_result}")
-        
-        # Exact pattern matching for connected state
-        connected_match = re.search(r'Connected to (.*?) in (.*?) mode, running on (.*?)($|\s)', clean_result)
-        disconnected_match = "VPN is disconnected" in clean_result
-        
-        if connected_match and not disconnected_match:
+        self.log(f"Status check result: {status.text}", "debug")
+        
+        self.view.update(stale=False)
+        self.remember_state("status", {
+            "connected": status.connected,
+            "location": status.location,
+            "protocol": status.protocol,
+            "interface": status.interface,
+        })
+        
+        self.tunnel_interface = status.interface if status.connected else None
+        self.tunnel_mode = status.protocol if status.connected else None
+        if status.connected:
             # We are connected
-            self.status_label.config(text="Status: Connected")
-            self.status_indicator.itemconfig(self.status_circle, fill="green")
-            self.connect_button.config(text="Disconnect")
-            
-            # Extract location, protocol, and interface from the match
-            location = connected_match.group(1).strip()
-            protocol = connected_match.group(2).strip()
-            interface = connected_match.group(3).strip()
-            
-            # If location is empty, use "Unknown location"
-            if not location or location.isspace():
-                location = "Unknown location"
-            
-            self.location_label.config(text=location)
-            self.protocol_label.config(text=f"{protocol} ({interface})")
+            self.view.update(
+                status_text="Status: Connected",
+                status_color="green",
+                button_text="Disconnect",
+                location=status.location,
+                protocol=f"{status.protocol} ({status.interface})"
+            )
             
-            # Get IP information using multiple methods
-            self.get_ip_information(interface)
+            # Resolve the IP once per connection session
+            key = self.ip_cache.key_for(status.interface)
+            hit, ip = self.ip_cache.lookup(key)
+            if not hit:
+                self.view.update(ip="Resolving...")
+                self.get_ip_information(status.interface, key)
         else:
             # We are disconnected
-            self.status_label.config(text="Status: Disconnected")
-            self.status_indicator.itemconfig(self.status_circle, fill="red")
-            self.connect_button.config(text="Connect")
-            
-            # Clear connection details
-            self.ip_label.config(text="Not connected")
-            self.location_label.config(text="Not connected")
-            self.protocol_label.config(text="Not connected")
+            self.show_disconnected("Status: Disconnected")
+            self.remember_state("ip", None)
             
             # Log this as well
-            if "VPN is disconnected" in clean_result:
+            if status.disconnected:
                 self.log("VPN is disconnected.")
-            elif "error" in clean_result.lower():
-                self.log(f"Error in VPN status: {clean_result}")
+            elif status.has_error:
+                self.log(f"Error in VPN status: {status.text}", "error")
             else:
-                self.log("Disconnected. Unknown status returned by CLI.")
+                self.log("Disconnected. Unknown status returned by CLI.", "warn")
+        
+        return status.key()
+
+    def on_link_event(self, event):
+        """React to a link or default-route change at once; the next status poll confirms it"""
+        self.log(f"Network change: {event.kind} {event.interface or ''}", "debug")
+        if event.kind in ("down", "removed"):
+            if event.interface and event.interface == self.tunnel_interface:
+                self.log(f"Tunnel interface {event.interface} went {event.kind}", "warn")
+                self.tunnel_interface = None
+                self.show_disconnected("Status: Disconnected (tunnel interface down)")
+                self.refresh_status_soon(boost=True)
+        elif event.kind == "route" or self.tunnel_interface is None:
+            # A new interface or default route may be the tunnel coming up
+            self.refresh_status_soon()
 
-    def get_ip_information(self, interface=None):
+    def get_ip_information(self, interface=None, key=None):
         """Get IP address information using multiple methods"""
-        self.log("Attempting to retrieve IP information...")
+        self.log("Attempting to retrieve IP information...", "debug")
         
         # First try to get from system commands
-        if self.get_ip_from_system(interface):
+        if self.get_ip_from_system(interface, key):
             return
         
         # Then try from config
-        self.run_command_async(["config", "show"], self.extract_ip_from_config)
+        self.run_command_async(["config", "show"], lambda result: self.extract_ip_from_config(result, key))
         
         # Finally, attempt to use an external API
-        self.get_ip_from_external_api()
+        self.get_ip_from_external_api(key)
 
-    def get_ip_from_system(self, interface=None):
-        """Try to get IP address from system commands"""
+    def set_ip(self, ip, key=None):
+        """Show a resolved IP and cache it, unless it belongs to an earlier connection"""
+        if key is not None and not self.ip_cache.store(key, ip):
+            return False
+        self.view.update(ip=ip)
+        self.remember_state("ip", ip)
+        return True
+
+    def get_ip_from_system(self, interface=None, key=None):
+        """Try to read the tunnel interface address from the kernel"""
         try:
-            if os.name == 'posix':  # Linux, macOS
-                cmd = ["ip", "addr", "show"]
-                if interface:
-                    cmd.append(interface)
-                    
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                if result.returncode == 0:
-                    import re
-                    # Look for IPv4 addresses
-                    ip_pattern = re.compile(r'inet\s+(\d+\.\d+\.\d+\.\d+)')
-                    match = ip_pattern.search(result.stdout)
-                    if match:
-                        ip = match.group(1)
-                        self.ip_label.config(text=ip)
-                        self.log(f"Found IP from system: {ip}")
-                        return True
-                    
-        except Exception as e:
-            self.log(f"Error getting IP from system: {e}")
+            ipv4, ipv6 = linux_introspect.interface_addresses(interface)
+        except OSError as e:
+            self.log(f"Error getting IP from system: {e}", "warn")
+            return False
         
+        ip = (ipv4 or ipv6 or [None])[0]
+        if ip:
+            self.set_ip(ip, key)
+            self.log(f"Found IP from system: {ip}")
+            return True
         return False
 
-    def get_ip_from_external_api(self):
-        """Use an external API to get the public IP address"""
-        try:
-            # Create a separate thread to avoid blocking the UI
-            def fetch_ip():
-                try:
-                    import urllib.request
-                    import json
-                    
-                    # Try multiple services in case one fails
-                    api_urls = [
-                        "https://api.ipify.org/?format=json",
-                        "https://httpbin.org/ip",
-                        "https://api.myip.com"
-                    ]
-                    
-                    for url in api_urls:
-                        try:
-                            with urllib.request.urlopen(url, timeout=3) as response:
-                                data = json.loads(response.read().decode())
-                                ip = None
-                                
-                                # Different APIs return IP in different JSON structures
-                                if "ip" in data:
-                                    ip = data["ip"]
-                                elif "origin" in data:
-                                    ip = data["origin"]
-                                
-                                if ip:
-                                    # Update UI from the main thread
-                                    self.root.after(0, lambda: self.ip_label.config(text=ip))
-                                    self.root.after(0, lambda: self.log(f"Found IP from external API: {ip}"))
-                                    return
-                        except Exception:
-                            continue
-                    
-                    # If we get here, all attempts failed
-                    self.root.after(0, lambda: self.log("Failed to get IP from external APIs"))
-                except Exception as e:
-                    self.root.after(0, lambda: self.log(f"Error in IP lookup thread: {e}"))
-            
-            threading.Thread(target=fetch_ip, daemon=True).start()
-        except Exception as e:
-            self.log(f"Error starting IP lookup thread: {e}")
+    def get_ip_from_external_api(self, key=None):
+        """Race the public IP endpoints on the engine loop and show the first answer"""
+        future = self.engine.submit_coroutine(self.public_ip_lookup.race())
+        
+        def done(future):
+            try:
+                ip, url = future.result()
+            except Exception as e:
+                self.log(f"Error in IP lookup: {e}", "error")
+                return
+            if ip:
+                self.log(f"Found IP from external API: {ip} ({url})")
+                self.view.call(lambda: self.set_ip(ip, key))
+            else:
+                self.log("Failed to get IP from external APIs", "warn")
+            self.log(f"IP endpoints: {self.public_ip_lookup.stats_summary()}", "debug")
+        
+        future.add_done_callback(done)
 
-    def extract_ip_from_config(self, result):
+    def extract_ip_from_config(self, result, key=None):
         # This is a helper function to extract IP from the config output
-        import re
-        
-        # Try to find IP in the config
-        ip_match = re.search(r'(?:IP Address|External IP|VPN IP):\s*(\S+)', result)
-        if ip_match:
-            self.ip_label.config(text=ip_match.group(1))
+        config = cli_parser.parse_config(result)
+        if config.ip:
+            self.set_ip(config.ip, key)
         else:
             # If not found in config, try a different approach
-            self.run_command_async(["status", "--verbose"], self.extract_ip_from_verbose)
+            self.run_command_async(["status", "--verbose"], lambda result: self.extract_ip_from_verbose(result, key))
 
-    def extract_ip_from_verbose(self, result):
+    def extract_ip_from_verbose(self, result, key=None):
         # Try to extract IP from verbose status
-        import re
-        
-        # Clean ANSI codes
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        clean_result = ansi_escape.sub('', result)
-        
-        # Look for IP
-        ip_pattern = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
-        ip_matches = ip_pattern.findall(clean_result)
-        if ip_matches:
-            self.ip_label.config(text=ip_matches[0])
-        else:
-            self.ip_label.config(text="IP not available")
+        ip = cli_parser.find_ipv4(result)
+        if ip:
+            self.set_ip(ip, key)
+        elif key is None or key == self.ip_cache.key:
+            if not self.ip_cache.ip:
+                self.view.update(ip="IP not available")
 
     def extract_additional_info(self, result):
         # Parse config output for additional connection details
-        lines = result.split('\n')
-        
-        for line in lines:
-            if "VPN location:" in line:
-                location = line.split("VPN location:")[1].strip()
-                if location:
-                    self.location_label.config(text=location)
-            
-            elif "VPN protocol:" in line:
-                protocol = line.split("VPN protocol:")[1].strip()
-                if protocol:
-                    self.protocol_label.config(text=protocol)
-            
-            elif "External IP:" in line or "IP Address:" in line:
-                ip_part = line.split(":", 1)
-                if len(ip_part) > 1 and ip_part[1].strip():
-                    self.ip_label.config(text=ip_part[1].strip())
+        config = cli_parser.parse_config(result)
+        if config.location:
+            self.view.update(location=config.location)
+        if config.protocol:
+            self.view.update(protocol=config.protocol)
+        if config.ip:
+            self.view.update(ip=config.ip)
 
     def toggle_connection(self):
         if not self.is_logged_in:
-            self.log("Not logged in. Please log in first.")
+            self.log("Not logged in. Please log in first.", "warn")
             self.show_login_dialog()
             return
         
-        if self.connect_button.cget("text") == "Connect":
+        if self.view.get("button_text") == "Connect":
             self.log("Connecting to VPN...")
-            self.status_label.config(text="Status: Connecting...")
-            self.status_indicator.itemconfig(self.status_circle, fill="yellow")
-            self.connect_button.config(state="disabled")
-            
-            try:
-                cmd = [self.executable, "connect", "--fastest"]
-                self.log(f"Running direct connection command: {' '.join(cmd)}")
-                
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=False,
-                    env=os.environ.copy()  # Ensure environment variables are passed
-                )
-                
-                if result.returncode != 0:
-                    self.log(f"Connection error: {result.stderr}")
-                    self.handle_connection_result(f"Error: {result.stderr}")
-                else:
-                    self.handle_connection_result(result.stdout)
-            except Exception as e:
-                self.log(f"Exception during connection: {str(e)}")
-                self.handle_connection_result(f"Error: {str(e)}")
+            self.start_connection(["connect", "--fastest"])
         else:
             self.log("Disconnecting from VPN...")
-            self.status_label.config(text="Status: Disconnecting...")
-            self.connect_button.config(state="disabled")
-            
-            try:
-                cmd = [self.executable, "disconnect"]
-                self.log(f"Running direct disconnect command: {' '.join(cmd)}")
-                
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=False,
-                    env=os.environ.copy()
-                )
-                
-                if result.returncode != 0:
-                    self.log(f"Disconnect error: {result.stderr}")
-                    self.handle_disconnection_result(f"Error: {result.stderr}")
-                else:
-                    self.handle_disconnection_result(result.stdout)
-            except Exception as e:
-                self.log(f"Exception during disconnection: {str(e)}")
-                self.handle_disconnection_result(f"Error: {str(e)}")
+            self.view.update(status_text="Status: Disconnecting...", button_state="disabled")
+            self.run_cli_async(["disconnect"], self._handle_disconnect_process)
+
+    def start_connection(self, args):
+        """Show the connecting state and run a connect command in the background"""
+        self.view.update(status_text="Status: Connecting...", status_color="yellow", button_state="disabled")
+        self.run_cli_async(args, self._handle_connect_process)
+
+    def _handle_connect_process(self, result):
+        if result.returncode != 0:
+            self.log(f"Connection error: {result.stderr}", "error")
+            self.handle_connection_result(f"Error: {result.stderr}")
+        else:
+            self.handle_connection_result(result.stdout)
+
+    def _handle_disconnect_process(self, result):
+        if result.returncode != 0:
+            self.log(f"Disconnect error: {result.stderr}", "error")
+            self.handle_disconnection_result(f"Error: {result.stderr}")
+        else:
+            self.handle_disconnection_result(result.stdout)
 
     def handle_connection_result(self, result):
         self.log_result(result)
+        # A new connection gets its IP resolved afresh
+        self.ip_cache.invalidate()
         # Enable the button again
-        self.connect_button.config(state="normal")
+        self.view.update(button_state="normal")
         
         # Check if the connection was successful
         if "error" in result.lower() or "failed" in result.lower():
-            self.status_label.config(text="Status: Connection Failed")
-            self.status_indicator.itemconfig(self.status_circle, fill="red")
-            self.connect_button.config(text="Connect")
+            self.view.update(status_text="Status: Connection Failed", status_color="red", button_text="Connect")
             
             # Show more detailed error message
             error_details = "Failed to connect to VPN."
@@ -950,200 +1181,334 @@ class AdGuardVPNGUI:
             
             messagebox.showerror("Connection Failed", error_details)
         else:
-            # After connecting, check status to update UI with a small delay
-            self.root.after(2000, lambda: self.run_command_async(["status"], self.process_status))
+            # After connecting, poll quickly until the state settles
+            self.refresh_status_soon(boost=True)
 
     def handle_disconnection_result(self, result):
         self.log_result(result)
         # Enable the button again
-        self.connect_button.config(state="normal")
+        self.view.update(button_state="normal")
         
         # After disconnecting, update the UI
-        self.status_label.config(text="Status: Disconnected")
-        self.status_indicator.itemconfig(self.status_circle, fill="red")
-        self.connect_button.config(text="Connect")
-        
-        # Clear connection details
-        self.ip_label.config(text="Not connected")
-        self.location_label.config(text="Not connected")
-        self.protocol_label.config(text="Not connected")
-
-    def log(self, message):
-        # Store early logs for later display
-        if not hasattr(self, '_early_logs'):
-            self._early_logs = []
-        
-        # Print to console for debugging
-        print(f"LOG: {message}")
-        
-        # Make sure we're updating the GUI from the main thread
-        if threading.current_thread() is threading.main_thread():
-            self._update_log(message)
-        else:
-            # Schedule the update to happen in the main thread
-            self.root.after(0, lambda: self._update_log(message))
-
-    def _update_log(self, message):
-        # This runs in the main thread
-        if not hasattr(self, 'log_text') or self.log_text is None:
-            # Store the message for later if log_text doesn't exist yet
-            if not hasattr(self, '_early_logs'):
-                self._early_logs = []
-            self._early_logs.append(message)
+        self.show_disconnected("Status: Disconnected")
+        
+        # Confirm the new state quickly
+        self.refresh_status_soon(boost=True)
+
+    def log(self, message, level="info"):
+        """Queue a message for the log pane and console if it passes the current level"""
+        if LEVELS[level] < self.log_level:
             return
+        if level != "info":
+            message = f"{level.upper()}: {message}"
         
+        # Safe from any thread; the Tk thread renders it on the next flush
+        self.log_buffer.append(message)
+
+    def set_log_level(self, level):
+        self.log_level = LEVELS[level]
+        self.log(f"Log level set to {level}")
+
+    def ui_tick(self):
+        """Apply queued UI events, redraw changed widgets and render buffered logs on a fixed tick"""
+        # Scheduled first: a queued callback may open a modal dialog, whose nested
+        # event loop must keep ticking so the rest of the queue is not held back
+        self.root.after(UI_TICK_MS, self.ui_tick)
         try:
-            self.log_text.config(state="normal")
-            self.log_text.insert(tk.END, message + "\n")
-            self.log_text.see(tk.END)
-            self.log_text.config(state="disabled")
+            self.render_view(self.view.drain())
         except Exception as e:
-            print(f"Error updating log: {e}")
+            self.log(f"Error applying UI update: {e}", "error")
+        finally:
+            self.write_log_lines()
+
+    def render_view(self, dirty):
+        """Reconfigure only the connection widgets whose backing fields changed"""
+        values = self.view.values
+        if "status_text" in dirty:
+            self.status_label.config(text=values["status_text"])
+        if "status_color" in dirty:
+            self.status_indicator.itemconfig(self.status_circle, fill=values["status_color"])
+        if "ip" in dirty:
+            self.ip_label.config(text=values["ip"])
+        if "location" in dirty:
+            self.location_label.config(text=values["location"])
+        if "protocol" in dirty:
+            self.protocol_label.config(text=values["protocol"])
+        if "download" in dirty:
+            self.download_label.config(text=values["download"])
+        if "upload" in dirty:
+            self.upload_label.config(text=values["upload"])
+        if "quality" in dirty:
+            self.quality_label.config(text=values["quality"])
+        if "button_text" in dirty or "button_state" in dirty:
+            self.connect_button.config(text=values["button_text"], state=values["button_state"])
+        if "stale" in dirty:
+            # Values restored from the snapshot are greyed out until a status check confirms them
+            fg = STALE_COLOR if values["stale"] else self.label_fg
+            for label in (self.status_label, self.ip_label, self.location_label, self.protocol_label):
+                label.config(fg=fg)
+
+    def sample_throughput(self):
+        """Sample the tunnel interface's byte counters and redraw the graph"""
+        meter = self.throughput
+        # In SOCKS mode the status names the proxy endpoint, and there is no interface to count
+        interface = self.tunnel_interface if self.tunnel_mode == "TUN" else None
+        if interface != meter.interface:
+            meter.reset(interface)
+        if meter.sample():
+            self.view.update(
+                download=f"{format_bytes(meter.rx_rate, '/s')} ({format_bytes(meter.rx_total)} total)",
+                upload=f"{format_bytes(meter.tx_rate, '/s')} ({format_bytes(meter.tx_total)} total)"
+            )
+        elif self.tunnel_interface and self.tunnel_mode == "SOCKS":
+            self.view.update(download="n/a in SOCKS mode", upload="n/a in SOCKS mode")
+        else:
+            self.view.update(download="Not connected", upload="Not connected")
+        # Drawing is skipped while the graph is not on screen; the history keeps filling
+        if self.tab_control.index("current") == 0:
+            self.draw_throughput()
+        self.root.after(self.throughput_sample_ms, self.sample_throughput)
+
+    def draw_throughput(self):
+        canvas = self.throughput_canvas
+        width = canvas.winfo_width()
+        height = THROUGHPUT_GRAPH_HEIGHT
+        if width < 10:
+            return
+        rx, tx = self.throughput.series(self.throughput_span_var.get() != THROUGHPUT_SPANS[0])
+        # At most one point every two pixels, whatever the length of the history
+        rx = decimate(rx, width // 2)
+        tx = decimate(tx, width // 2)
+        peak = max(max(rx, default=0), max(tx, default=0))
+        canvas.itemconfig(self.peak_text, text=f"peak {format_bytes(peak, '/s')}" if rx else "")
+        
+        for line, values in ((self.rx_line, rx), (self.tx_line, tx)):
+            if len(values) < 2:
+                canvas.itemconfig(line, state="hidden")
+                continue
+            step = (width - 1) / (len(values) - 1)
+            coords = []
+            for index, value in enumerate(values):
+                coords.append(index * step)
+                coords.append(height - 2 - (value / peak * (height - 4) if peak else 0))
+            canvas.coords(line, *coords)
+            canvas.itemconfig(line, state="normal")
+
+    def socks_endpoint(self):
+        """SOCKS host and port from the Settings tab, or the last saved settings"""
+        if self.current_settings is not None:
+            settings = self.current_settings.as_dict()
+        else:
+            settings = self.snapshot.get("settings") or {}
+        host = settings.get("socks_host") or DEFAULT_SOCKS_ENDPOINT[0]
+        if host in ("0.0.0.0", "::"):
+            host = DEFAULT_SOCKS_ENDPOINT[0]
+        port = settings.get("socks_port") or ""
+        return host, int(port) if port.isdigit() else DEFAULT_SOCKS_ENDPOINT[1]
+
+    def probe_quality(self):
+        """Start a round of quality probes through the tunnel on the engine loop"""
+        self.root.after(QUALITY_PROBE_MS, self.probe_quality)
+        monitor = self.quality_monitor
+        if not self.tunnel_interface:
+            if monitor.interface is not None or monitor.socks is not None:
+                monitor.reset()
+            self.view.update(quality="Not connected")
+            return
+        if self._quality_round is not None:
+            # The previous round is still waiting on slow targets
+            return
+        
+        socks = self.socks_endpoint() if self.tunnel_mode == "SOCKS" else None
+        interface = None if socks else self.tunnel_interface
+        if (monitor.interface, monitor.socks) != (interface, socks):
+            monitor.reset(interface, socks)
+            self.view.update(quality=format_summary(None))
+        
+        self._quality_round = self.engine.submit_coroutine(monitor.probe_round())
+        self._quality_round.add_done_callback(lambda done: self.view.call(self.quality_round_finished))
+
+    def quality_round_finished(self):
+        self._quality_round = None
+        if self.tunnel_interface:
+            self.view.update(quality=format_summary(self.quality_monitor.summary()))
+
+    def show_disconnected(self, status_text):
+        """Show the disconnected state and forget the connection details"""
+        self.ip_cache.invalidate()
+        self.view.update(
+            status_text=status_text,
+            status_color="red",
+            button_text="Connect",
+            ip="Not connected",
+            location="Not connected",
+            protocol="Not connected"
+        )
+
+    def write_log_lines(self):
+        """Send all buffered log lines to the console, the log file and the log pane"""
+        lines, dropped = self.log_buffer.drain()
+        if lines:
+            if dropped:
+                lines.insert(0, f"... {dropped} log lines dropped ...")
+            replace_last, rendered, output = self.log_folder.fold(lines)
+            
+            # Print to console for debugging, and queue for the log file
+            for line in output:
+                print(f"LOG: {line}")
+                self.log_writer.write(line)
+            
+            try:
+                self.log_text.config(state="normal")
+                if replace_last:
+                    # Repeats of the last line fold into it as "(xN)"
+                    self.log_text.delete("end-2c linestart", "end-1c")
+                self.log_text.insert(tk.END, "\n".join(rendered) + "\n")
+                
+                # Keep the widget at a constant size
+                line_count = int(self.log_text.index("end-1c").split(".")[0]) - 1
+                if line_count > LOG_MAX_LINES:
+                    self.log_text.delete("1.0", f"{line_count - LOG_MAX_LINES + 1}.0")
+                
+                self.log_text.see(tk.END)
+                self.log_text.config(state="disabled")
+            except Exception as e:
+                print(f"Error updating log: {e}")
 
     def log_result(self, result):
         self.log(result)
 
     # Locations tab methods
-    def fetch_locations(self):
-        self.clear_location_tree()
-        self.add_loading_indicator()
+    def fetch_locations(self, use_cache=True):
+        # Existing rows stay in place; the refresh only applies what changed
+        if not len(self.location_model):
+            self.clear_location_tree()
+            self.add_loading_indicator()
         
-        self.run_command_async(["list-locations"], self.process_locations)
+        self.run_command_async(["list-locations"], self.process_locations, use_cache=use_cache)
+
+    def auto_refresh_locations(self):
+        """Refresh the location list in the background and schedule the next refresh"""
+        if self.is_logged_in:
+            self.fetch_locations()
+        self.root.after(LOCATION_REFRESH_MS, self.auto_refresh_locations)
 
     def clear_location_tree(self):
         """Clear all items from the location tree"""
-        for item in self.location_tree.get_children():
-            self.location_tree.delete(item)
+        self.location_tree.delete(*self.location_tree.get_children())
+        self._shown_locations = None
+
+    def show_location_placeholder(self, text):
+        """Show a single informational row in place of the locations"""
+        if self.location_tree.exists(LOCATION_PLACEHOLDER):
+            self.location_tree.item(LOCATION_PLACEHOLDER, values=("", text, "", ""))
+        else:
+            self.location_tree.insert("", "end", iid=LOCATION_PLACEHOLDER, values=("", text, "", ""))
 
     def add_loading_indicator(self):
         """Add a loading indicator to the location tree"""
-        self.location_tree.insert("", "end", values=("", "Loading locations...", "", ""))
+        self.show_location_placeholder("Loading locations...")
 
     def process_locations(self, result):
-        """Process the locations output from the CLI"""
-        self.clear_location_tree()
-        
-        # Strip ANSI escape codes from the output
-        import re
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        result = ansi_escape.sub('', result)
-        
-        lines = result.split('\n')
-        header_found = False
+        """Apply the locations output from the CLI as a delta against the current rows"""
+        locations = cli_parser.parse_locations(result)
+        if not locations and len(self.location_model):
+            self.log("Location refresh returned no locations; keeping the current list", "warn")
+            return
         
-        for line in lines:
-            if not header_found and "ISO" in line and "COUNTRY" in line:
-                header_found = True
-                continue
-            
-            if header_found and line.strip():
-                # Use regex to split by 2 or more spaces which is how the CLI formats the output
-                columns = re.split(r'\s{2,}', line.strip())
-                
-                if len(columns) >= 4:
-                    iso = columns[0]
-                    country = columns[1]
-                    city = columns[2]
-                    ping = columns[3]
-                    
-                    self.location_tree.insert("", "end", values=(iso, country, city, ping))
+        self.apply_locations(locations)
+        if locations:
+            self.remember_state("locations", [list(location.values()) for location in locations])
+
+    def apply_locations(self, locations, stale=False):
+        """Update the table to show locations, touching only rows that changed"""
+        if not stale:
+            # Rows restored from the snapshot are confirmed by this refresh
+            for key in self.location_tree.tag_has("stale"):
+                self.location_tree.item(key, tags=())
+        
+        added, removed, changed = self.location_model.update(locations)
+        if removed:
+            self.location_tree.delete(*removed)
+        tags = ("stale",) if stale else ()
+        for key in added:
+            # Inserted detached; show_filtered_locations attaches the ones the search matches
+            self.location_tree.insert("", "end", iid=key, values=self.location_model.get(key).values(), tags=tags)
+            self.location_tree.detach(key)
+        if added:
+            self._shown_locations = None
+        for key in changed:
+            self.location_tree.item(key, values=self.location_model.get(key).values())
+        if added or removed or changed:
+            self.log(f"Locations updated: {len(added)} added, {len(removed)} removed, {len(changed)} changed")
         
         # If no locations were found
-        if not self.location_tree.get_children():
-            self.location_tree.insert("", "end", values=("", "No locations found or not logged in", "", ""))
+        if not len(self.location_model):
+            self.show_location_placeholder("No locations found or not logged in")
+            return
         
-        # Sort by ping by default
-        self.sort_locations_by_column("ping", True)
+        # Reorder with the current sort and search, keeping selection and scroll position
+        first_visible = self.location_tree.yview()[0]
+        self.filter_location_tree(self.search_var.get())
+        self.location_tree.yview_moveto(first_visible)
+        self.update_location_headings()
 
-    def sort_locations_by_column(self, column, initial_sort=False):
-        """Sort the location tree by the given column"""
-        items = [(self.location_tree.set(item, column), item) for item in self.location_tree.get_children('')]
-        
-        # If it's the ping column, sort numerically
-        if column == "ping":
-            try:
-                items.sort(key=lambda x: int(x[0]) if x[0].isdigit() else float('inf'))
-            except (ValueError, TypeError):
-                items.sort()
-        else:
-            items.sort()
-        
-        # Rearrange items in the tree
-        for index, (_, item) in enumerate(items):
-            self.location_tree.move(item, '', index)
-        
-        # If not the initial sort, configure the heading to sort the other way next time
-        if not initial_sort:
-            self.location_tree.heading(
-                column, 
-                command=lambda col=column: self.sort_locations_by_reverse_column(col)
-            )
+    def sort_locations_by_column(self, column):
+        """Sort the location tree by the given column, reversing on repeated clicks"""
+        if not len(self.location_model):
+            return
+        self.location_model.toggle_sort(column)
+        self.show_filtered_locations()
+        self.update_location_headings()
 
-    def sort_locations_by_reverse_column(self, column):
-        """Sort the location tree by the given column in reverse order"""
-        items = [(self.location_tree.set(item, column), item) for item in self.location_tree.get_children('')]
-        
-        # If it's the ping column, sort numerically
-        if column == "ping":
-            try:
-                items.sort(key=lambda x: int(x[0]) if x[0].isdigit() else float('inf'), reverse=True)
-            except (ValueError, TypeError):
-                items.sort(reverse=True)
-        else:
-            items.sort(reverse=True)
-        
-        # Rearrange items in the tree
-        for index, (_, item) in enumerate(items):
-            self.location_tree.move(item, '', index)
-        
-        # Configure the heading to sort normally next time
-        self.location_tree.heading(
-            column, 
-            command=lambda col=column: self.sort_locations_by_column(col, False)
-        )
+    def update_location_headings(self):
+        """Mark the sort column and direction in the headings"""
+        for column, title in self.location_headings.items():
+            if column == self.location_model.sort_column:
+                title += " \u25BC" if self.location_model.descending else " \u25B2"
+            self.location_tree.heading(column, text=title)
 
     def search_locations(self):
         """Search for locations matching the search term"""
-        search_term = self.search_entry.get().lower()
-        if not search_term:
+        if not len(self.location_model):
+            # Nothing loaded yet; the search is applied once the list arrives
             self.fetch_locations()
             return
         
-        if self.location_tree.get_children():
-            self.filter_location_tree(search_term)
-        else:
-            self.clear_location_tree()
-            self.add_loading_indicator()
-            self.run_command_async(["list-locations"], lambda result: self.process_search(result, search_term))
+        self.filter_location_tree(self.search_var.get())
+
+    def schedule_location_filter(self):
+        """Filter shortly after the last keystroke"""
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.apply_scheduled_filter)
+
+    def apply_scheduled_filter(self):
+        self._search_after_id = None
+        if len(self.location_model):
+            self.filter_location_tree(self.search_var.get())
 
     def filter_location_tree(self, search_term):
-        """Filter the existing location tree by search term"""
-        # Hide all items that don't match
-        visible_count = 0
-        for item in self.location_tree.get_children():
-            values = [str(self.location_tree.set(item, col)).lower() for col in ("iso", "country", "city")]
-            if any(search_term in value for value in values):
-                self.location_tree.item(item, tags=())
-                visible_count += 1
-            else:
-                self.location_tree.item(item, tags=('hidden',))
-        
-        # Apply a tag to hide non-matching items
-        self.location_tree.tag_configure('hidden', hide=True)
-        
-        if visible_count == 0:
-            self.clear_location_tree()
-            self.location_tree.insert("", "end", values=("", f"No locations found matching '{search_term}'", "", ""))
+        """Filter the location tree by search term using the model's index"""
+        self.location_matches = self.location_model.search(search_term)
+        self.show_filtered_locations()
 
-    def process_search(self, result, search_term):
-        """Process the locations output and filter by search term"""
-        self.process_locations(result)
-        self.filter_location_tree(search_term)
+    def show_filtered_locations(self):
+        """Attach matching rows in sort order and detach the rest, in a single Tcl call"""
+        visible = self.location_model.visible_order(self.location_matches)
+        if self.location_tree.exists(LOCATION_PLACEHOLDER):
+            self.location_tree.delete(LOCATION_PLACEHOLDER)
+        if visible != self._shown_locations:
+            self.location_tree.set_children("", *visible)
+            self._shown_locations = visible
+        
+        if not visible:
+            self.show_location_placeholder(f"No locations found matching '{self.search_var.get().strip()}'")
 
     def connect_to_selected(self):
         """Connect to the selected location"""
         if not self.is_logged_in:
-            self.log("Not logged in. Please log in first.")
+            self.log("Not logged in. Please log in first.", "warn")
             self.show_login_dialog()
             return
         
@@ -1158,157 +1523,154 @@ class AdGuardVPNGUI:
             return
         
         self.log(f"Connecting to {city}...")
-        self.status_label.config(text="Status: Connecting...")
-        self.status_indicator.itemconfig(self.status_circle, fill="yellow")
-        self.connect_button.config(state="disabled")
-        
-        try:
-            cmd = [self.executable, "connect", "--location", city]
-            self.log(f"Running direct connection command: {' '.join(cmd)}")
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=False,
-                env=os.environ.copy()
-            )
-            
-            if result.returncode != 0:
-                self.log(f"Connection error: {result.stderr}")
-                self.handle_connection_result(f"Error: {result.stderr}")
-            else:
-                self.handle_connection_result(result.stdout)
-        except Exception as e:
-            self.log(f"Exception during connection: {str(e)}")
-            self.handle_connection_result(f"Error: {str(e)}")
-        
+        self.start_connection(["connect", "--location", city])
         self.tab_control.select(0)
 
     def connect_to_fastest(self):
         """Connect to the fastest location"""
         if not self.is_logged_in:
-            self.log("Not logged in. Please log in first.")
+            self.log("Not logged in. Please log in first.", "warn")
             self.show_login_dialog()
             return
         
         self.log("Connecting to fastest location...")
-        self.status_label.config(text="Status: Connecting...")
-        self.status_indicator.itemconfig(self.status_circle, fill="yellow")
-        self.connect_button.config(state="disabled")
-        
-        try:
-            cmd = [self.executable, "connect", "--fastest"]
-            self.log(f"Running direct connection command: {' '.join(cmd)}")
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=False,
-                env=os.environ.copy()
-            )
-            
-            if result.returncode != 0:
-                self.log(f"Connection error: {result.stderr}")
-                self.handle_connection_result(f"Error: {result.stderr}")
-            else:
-                self.handle_connection_result(result.stdout)
-        except Exception as e:
-            self.log(f"Exception during connection: {str(e)}")
-            self.handle_connection_result(f"Error: {str(e)}")
-        
+        self.start_connection(["connect", "--fastest"])
         self.tab_control.select(0)
 
     # Settings tab methods
     def load_settings(self):
         # Get current configuration
-        config_output = self.run_command(["config", "show"])
-        
+        self.run_command_async(["config", "show"], self.process_settings)
+
+    def process_settings(self, config_output):
         # Parse the output to set the UI elements
-        lines = config_output.split('\n')
-        for line in lines:
-            line = line.strip()
-            if "VPN mode:" in line:
-                mode = line.split("VPN mode:")[1].strip()
-                self.mode_var.set(mode)
-            elif "SOCKS port:" in line:
-                port = line.split("SOCKS port:")[1].strip()
-                self.socks_port_entry.delete(0, tk.END)
-                self.socks_port_entry.insert(0, port)
-            elif "SOCKS host:" in line:
-                host = line.split("SOCKS host:")[1].strip()
-                self.socks_host_entry.delete(0, tk.END)
-                self.socks_host_entry.insert(0, host)
-            elif "DNS server:" in line:
-                dns = line.split("DNS server:")[1].strip()
-                self.dns_entry.delete(0, tk.END)
-                self.dns_entry.insert(0, dns)
-            elif "Update channel:" in line:
-                channel = line.split("Update channel:")[1].strip()
-                self.update_channel_var.set(channel)
+        config = cli_parser.parse_config(config_output)
+        self.show_settings(config)
+        self.mark_fresh(self.socks_port_entry, self.socks_host_entry, self.dns_entry)
+        if config.mode is not None:
+            self.current_settings = config
+            self.remember_state("settings", config.as_dict())
+            if self.settings_transaction is None:
+                self.apply_button.config(state=tk.NORMAL)
+
+    def show_settings(self, config):
+        if config.mode is not None:
+            self.mode_var.set(config.mode)
+        if config.socks_port is not None:
+            self.socks_port_entry.delete(0, tk.END)
+            self.socks_port_entry.insert(0, config.socks_port)
+        if config.socks_host is not None:
+            self.socks_host_entry.delete(0, tk.END)
+            self.socks_host_entry.insert(0, config.socks_host)
+        if config.dns is not None:
+            self.dns_entry.delete(0, tk.END)
+            self.dns_entry.insert(0, config.dns)
+        if config.update_channel is not None:
+            self.update_channel_var.set(config.update_channel)
 
     def apply_settings(self):
-        # Apply VPN mode
-        mode = self.mode_var.get()
-        self.run_command(["config", "set-mode", mode])
-        
-        # Apply SOCKS settings
-        socks_port = self.socks_port_entry.get()
-        socks_host = self.socks_host_entry.get()
-        
-        if socks_port:
-            self.run_command(["config", "set-socks-port", socks_port])
-        
-        if socks_host:
-            self.run_command(["config", "set-socks-host", socks_host])
+        desired = {
+            "mode": self.mode_var.get(),
+            "socks_port": self.socks_port_entry.get().strip(),
+            "socks_host": self.socks_host_entry.get().strip(),
+            "dns": self.dns_entry.get().strip(),
+            "update_channel": self.update_channel_var.get()
+        }
+        # Empty fields are left as they are
+        desired = {key: value for key, value in desired.items() if value}
+        
+        if self.current_settings is None:
+            # Without a baseline every key would look changed and nothing could be rolled back
+            messagebox.showerror("Settings Not Loaded",
+                                 "The current settings have not been read yet, so nothing was applied.\n"
+                                 "Please wait for them to load and try again.")
+            self.load_settings()
+            return
         
-        # Apply DNS settings
-        dns_server = self.dns_entry.get()
-        if dns_server:
-            self.run_command(["config", "set-dns", dns_server])
+        errors = settings_tx.validate(desired)
+        if errors:
+            messagebox.showerror("Invalid Settings", "\n".join(errors.values()))
+            return
         
-        # Apply update channel
-        update_channel = self.update_channel_var.get()
-        self.run_command(["config", "set-update-channel", update_channel])
+        transaction = settings_tx.SettingsTransaction(
+            self.run_cli_async, self.current_settings, desired, self.settings_applied
+        )
+        if not transaction.keys:
+            messagebox.showinfo("Settings Applied", "No settings have changed")
+            return
         
-        messagebox.showinfo("Settings Applied", "Settings have been applied successfully")
+        self.log(f"Applying settings: {', '.join(transaction.keys)}")
+        self.apply_button.config(state=tk.DISABLED)
+        self.settings_transaction = transaction
+        transaction.start()
+
+    def settings_applied(self, results):
+        self.settings_transaction = None
+        self.apply_button.config(state=tk.NORMAL)
+        report = settings_tx.format_report(results)
+        for line in report.splitlines():
+            self.log(f"Setting {line}")
+        
+        if all(outcome == settings_tx.APPLIED for outcome, _ in results.values()):
+            messagebox.showinfo("Settings Applied", f"Settings have been applied successfully\n\n{report}")
+        else:
+            messagebox.showerror("Settings Not Applied",
+                                 f"Some settings could not be applied, so the others were reverted\n\n{report}")
+        # Show what the CLI actually ended up with
+        self.load_settings()
 
     # Exclusions tab methods
     def apply_exclusion_mode(self):
         mode = self.exclusion_mode_var.get()
-        self.run_command(["site-exclusions", "mode", mode])
-        messagebox.showinfo("Mode Applied", f"Exclusion mode set to '{mode}'")
+        self.run_command_async(
+            ["site-exclusions", "mode", mode],
+            lambda result: messagebox.showinfo("Mode Applied", f"Exclusion mode set to '{mode}'")
+        )
 
-    def refresh_exclusions(self):
-        self.exclusions_listbox.delete(0, tk.END)
-        self.exclusions_listbox.insert(tk.END, "Loading exclusions...")
+    def refresh_exclusions(self, use_cache=True):
+        if not len(self.exclusion_model.sites):
+            self.exclusions_view.show_message("Loading exclusions...")
         
-        self.run_command_async(["site-exclusions", "show"], self.process_exclusions)
+        self.run_command_async(["site-exclusions", "show"], self.process_exclusions, use_cache=use_cache)
 
     def process_exclusions(self, result):
-        self.exclusions_listbox.delete(0, tk.END)
-        
-        lines = result.split('\n')
-        mode_line = None
-        exclusions = []
-        
-        for line in lines:
-            if "Exclusion mode:" in line:
-                mode_line = line
-                mode = line.split("Exclusion mode:")[1].strip()
-                self.exclusion_mode_var.set(mode)
-            elif line.strip() and "Exclusion mode:" not in line and "Site exclusions:" not in line:
-                exclusions.append(line.strip())
-        
-        if exclusions:
-            for exclusion in exclusions:
-                self.exclusions_listbox.insert(tk.END, exclusion)
+        exclusions = cli_parser.parse_exclusions(result)
+        self.show_exclusions(exclusions)
+        self.mark_fresh(self.exclusions_listbox)
+        if exclusions.mode is not None:
+            self.current_exclusions = exclusions
+            self.remember_state("exclusions", {"mode": exclusions.mode, "sites": exclusions.sites})
+
+    def show_exclusions(self, exclusions):
+        if exclusions.mode is not None:
+            self.exclusion_mode_var.set(exclusions.mode)
+        
+        self.exclusion_model.load(exclusions.sites)
+        self.exclusions_view.selected.intersection_update(exclusions.sites)
+        if exclusions.sites:
+            self.show_filtered_exclusions()
+        elif exclusions.mode is not None:
+            self.exclusions_view.show_message("No exclusions set")
         else:
-            if mode_line:
-                self.exclusions_listbox.insert(tk.END, "No exclusions set")
-            else:
-                self.exclusions_listbox.insert(tk.END, "Could not retrieve exclusions")
+            self.exclusions_view.show_message("Could not retrieve exclusions")
+
+    def schedule_exclusion_filter(self):
+        """Filter shortly after the last keystroke"""
+        if self._exclusion_search_after_id is not None:
+            self.root.after_cancel(self._exclusion_search_after_id)
+        self._exclusion_search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.apply_exclusion_filter)
+
+    def apply_exclusion_filter(self):
+        self._exclusion_search_after_id = None
+        if self.exclusion_model.sites:
+            self.exclusion_model.filter(self.exclusion_search_var.get())
+            self.show_filtered_exclusions(keep_position=False)
+
+    def show_filtered_exclusions(self, keep_position=True):
+        if len(self.exclusion_model):
+            self.exclusions_view.refresh(keep_position)
+        else:
+            self.exclusions_view.show_message("No exclusions match your search")
 
     def add_exclusion(self):
         site = self.add_exclusion_entry.get().strip()
@@ -1316,30 +1678,158 @@ class AdGuardVPNGUI:
             messagebox.showinfo("Information", "Please enter a site to add")
             return
         
-        self.run_command(["site-exclusions", "add", site])
         self.add_exclusion_entry.delete(0, tk.END)
-        self.refresh_exclusions()
+        self.run_command_async(["site-exclusions", "add", site], lambda result: self.refresh_exclusions())
 
     def remove_exclusion(self):
-        selected = self.exclusions_listbox.curselection()
-        if not selected:
+        # Only what the current search shows can be removed, never rows the user cannot see
+        sites = [site for site in self.exclusions_view.selection() if self.exclusion_model.matches_filter(site)]
+        if not sites:
             messagebox.showinfo("Information", "Please select an exclusion to remove")
             return
+        if len(sites) > 1:
+            names = "\n".join(sites[:10])
+            if len(sites) > 10:
+                names += f"\n... and {len(sites) - 10} more"
+            if not messagebox.askyesno("Confirm", f"Remove {len(sites)} selected exclusions?\n\n{names}"):
+                return
         
-        site = self.exclusions_listbox.get(selected[0])
-        self.run_command(["site-exclusions", "remove", site])
-        self.refresh_exclusions()
+        self.log(f"Removing {len(sites)} exclusions")
+        self.exclusions_view.clear_selection()
+        exclusion_io.ExclusionChange(self.run_cli_async, remove=sites, on_done=self.exclusion_change_finished).start()
 
     def clear_exclusions(self):
         if messagebox.askyesno("Confirm", "Are you sure you want to clear all exclusions?"):
-            self.run_command(["site-exclusions", "clear"])
-            self.refresh_exclusions()
+            self.run_command_async(["site-exclusions", "clear"], lambda result: self.refresh_exclusions())
+
+    def optimize_exclusions(self):
+        """Offer to replace the exclusion list with a minimal equivalent one"""
+        if not self.current_exclusions or not self.current_exclusions.sites:
+            messagebox.showinfo("Information", "There are no exclusions to optimize")
+            return
+        
+        plan = ExclusionPlan(self.current_exclusions.sites)
+        if not plan.changed:
+            messagebox.showinfo("Optimize Exclusions", "The exclusion list is already minimal")
+            return
+        if not messagebox.askyesno("Optimize Exclusions", f"{plan.describe()}\n\nApply these changes?"):
+            return
+        
+        self.log(f"Optimizing exclusions: removing {len(plan.remove)}, adding {len(plan.add)}")
+        exclusion_io.ExclusionChange(
+            self.run_cli_async, plan.remove, plan.add, self.exclusion_change_finished
+        ).start()
+
+    def exclusion_change_finished(self, change):
+        for error in change.errors:
+            self.log(f"Exclusion update error: {error}", "error")
+        if change.failed:
+            messagebox.showerror("Error", f"{change.failed} exclusions could not be updated")
+        self.refresh_exclusions()
+
+    def import_exclusions(self):
+        if self.exclusion_import is not None:
+            messagebox.showinfo("Information", "An import is already running")
+            return
+        
+        path = filedialog.askopenfilename(
+            filetypes=[("Text files", "*.txt"), ("Hosts files", "hosts"), ("All files", "*.*")],
+            title="Import Exclusions"
+        )
+        if not path:
+            return
+        
+        existing = self.current_exclusions.sites if self.current_exclusions else ()
+        try:
+            self.exclusion_import = exclusion_io.ExclusionImport(
+                self.run_cli_async, path, existing, self.exclusion_import_progress, self.exclusion_import_finished,
+                self.root.after_idle
+            )
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not read {path}: {e}")
+            return
+        
+        self.log(f"Importing exclusions from {path}...")
+        self.show_import_dialog()
+        self.exclusion_import.start()
+
+    def show_import_dialog(self):
+        self.import_window = tk.Toplevel(self.root)
+        self.import_window.title("Importing Exclusions")
+        self.import_window.geometry("400x150")
+        self.import_window.resizable(False, False)
+        self.import_window.transient(self.root)
+        self.import_window.protocol("WM_DELETE_WINDOW", self.cancel_exclusion_import)
+        
+        import_frame = tk.Frame(self.import_window, bg=self.bg_color, padx=20, pady=20)
+        import_frame.pack(fill="both", expand=True)
+        
+        self.import_label = tk.Label(import_frame, text="Reading list...", bg=self.bg_color)
+        self.import_label.pack(anchor="w")
+        
+        self.import_progress = ttk.Progressbar(import_frame, maximum=100, length=360)
+        self.import_progress.pack(fill="x", pady=10)
+        
+        tk.Button(
+            import_frame, 
+            text="Cancel", 
+            command=self.cancel_exclusion_import,
+            bg="#E57373",
+            fg="white",
+            relief="flat",
+            padx=10
+        ).pack()
+
+    def cancel_exclusion_import(self):
+        if self.exclusion_import is not None:
+            self.exclusion_import.cancel()
+            self.import_label.config(text="Cancelling after the current batch...")
+
+    def exclusion_import_progress(self, job):
+        self.import_progress.config(value=job.reader.fraction * 100)
+        if not job.cancelled:
+            self.import_label.config(text=job.summary())
+
+    def exclusion_import_finished(self, job):
+        self.exclusion_import = None
+        self.import_window.destroy()
+        
+        summary = job.summary()
+        self.log(f"Exclusion import: {summary}")
+        for error in job.errors:
+            self.log(f"Exclusion import error: {error}", "error")
+        if job.failed:
+            messagebox.showerror("Import Finished", summary)
+        else:
+            messagebox.showinfo("Import Finished", summary)
+        self.refresh_exclusions()
+
+    def export_exclusions(self):
+        if not self.current_exclusions or not self.current_exclusions.sites:
+            messagebox.showinfo("Information", "There are no exclusions to export")
+            return
+        
+        path = filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            title="Export Exclusions"
+        )
+        if not path:
+            return
+        
+        try:
+            exclusion_io.export_exclusions(path, self.current_exclusions.sites)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not write {path}: {e}")
+            return
+        self.log(f"Exported {len(self.current_exclusions.sites)} exclusions to {path}")
 
     # About tab methods
     def check_update(self):
         self.log("Checking for updates...")
-        result = self.run_command(["check-update"])
-        
+        self.run_command_async(["check-update"], self.process_update_check)
+
+    def process_update_check(self, result):
         if "update available" in result.lower():
             if messagebox.askyesno("Update Available", "An update is available. Would you like to install it?"):
                 self.run_command_async(["update", "--yes"], self.log_result)
@@ -1358,8 +1848,9 @@ class AdGuardVPNGUI:
             self.run_command_async(["export-logs", "--output", output_path], self.log_result)
 
     def show_license(self):
-        result = self.run_command(["license"])
-        
+        self.run_command_async(["license"], self.display_license)
+
+    def display_license(self, result):
         license_window = tk.Toplevel(self.root)
         license_window.title("License Information")
         license_window.geometry("600x400")
@@ -1372,55 +1863,47 @@ class AdGuardVPNGUI:
     def manual_refresh_status(self):
         """Manually refresh the VPN status"""
         self.log("Manually refreshing VPN status...")
-        self.status_label.config(text="Status: Checking...")
-        self.status_indicator.itemconfig(self.status_circle, fill="gray")
+        self.view.update(status_text="Status: Checking...", status_color="gray")
         
         # Force a process list check to see if the VPN process is actually running
         self.check_vpn_process_running()
         
-        # Also run the status command
-        self.run_command_async(["status"], self.process_status)
+        # Also run the status command, unless one is already in flight
+        self._status_uncached = True
+        self.update_status()
 
     def check_vpn_process_running(self):
-        """Check if the VPN process is actually running using ps"""
-        try:
-            # Get the base name of the executable
-            import os
-            exe_name = os.path.basename(self.executable)
-            
-            # Check the process list
-            if os.name == 'posix':
-                cmd = ["ps", "-A"]
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                
-                # Simple check - look for the executable name in the output
-                is_running = exe_name in result.stdout
-                
-                # Log the finding
-                self.log(f"Process check: VPN process '{exe_name}' {'is' if is_running else 'is not'} running")
-                
-                # If it's not running, ensure the UI reflects disconnected state
-                if not is_running:
-                    self.status_label.config(text="Status: Disconnected (process not running)")
-                    self.status_indicator.itemconfig(self.status_circle, fill="red")
-                    self.connect_button.config(text="Connect")
-                    self.ip_label.config(text="Not connected")
-                    self.location_label.config(text="Not connected")
-                    self.protocol_label.config(text="Not connected")
-
-        except Exception as e:
-            self.log(f"Error checking process status: {e}")
+        """Check in /proc if the VPN process is actually running"""
+        if not os.path.isdir(linux_introspect.PROC):
+            return
+        
+        # Our own short-lived CLI calls are children of this process and do not count
+        pids = linux_introspect.find_processes(self.executable, exclude_parent=os.getpid())
+        exe_name = os.path.basename(self.executable)
+        self.log(f"Process check: VPN process '{exe_name}' {'is' if pids else 'is not'} running", "debug")
+        
+        # If it's not running, ensure the UI reflects disconnected state
+        if not pids:
+            self.show_disconnected("Status: Disconnected (process not running)")
 
     def check_login_status(self):
         """Check if the user is logged in to the VPN service"""
-        self.log("Checking login status...")
+        self.log("Checking login status...", "debug")
         
         # Run the status command to see if we can access the service
-        result = self.run_command(["status"], check_error=False)
-        
+        self.run_command_async(["status"], self.process_login_status, check_error=False)
+
+    def process_login_status(self, result):
         if "Before connecting to a location, you must log in" in result or "You are not logged in" in result:
             self.is_logged_in = False
-            self.log("You are not logged in to AdGuard VPN")
+            self.log("You are not logged in to AdGuard VPN", "warn")
+            
+            # The status poller only starts after login, so replace the state restored from the snapshot now
+            self.tunnel_interface = None
+            self.tunnel_mode = None
+            self.show_disconnected("Status: Not logged in")
+            self.view.update(stale=False)
+            self.remember_state("status", {"connected": False, "location": None, "protocol": None, "interface": None})
             
             # Ask user if they want to log in now
             if messagebox.askyesno("Login Required", 
@@ -1478,11 +1961,19 @@ class AdGuardVPNGUI:
                 return
             
             message_label.config(text="Logging in...")
-            login_window.update()
+            login_button.config(state="disabled")
             
             # Run the login command
-            result = self.run_command(["login", "--username", username, "--password", password], check_error=False)
-            
+            self.run_command_async(
+                ["login", "--username", username, "--password", password],
+                login_finished,
+                check_error=False
+            )
+        
+        def login_finished(result):
+            if not login_window.winfo_exists():
+                return
+            login_button.config(state="normal")
             if "successfully logged in" in result.lower() or "you are already logged in" in result.lower():
                 self.is_logged_in = True
                 self.log("Successfully logged in to AdGuard VPN")
@@ -1523,27 +2014,92 @@ class AdGuardVPNGUI:
     def logout_user(self):
         """Log out the current user"""
         if messagebox.askyesno("Confirm Logout", "Are you sure you want to log out?"):
-            result = self.run_command(["logout"], check_error=False)
-            if "successfully logged out" in result.lower():
-                self.is_logged_in = False
-                self.log("Successfully logged out")
-                messagebox.showinfo("Logged Out", "You have been logged out from AdGuard VPN")
-            else:
-                self.log(f"Logout error: {result}")
-                messagebox.showerror("Logout Error", "Could not log out properly. See logs for details.")
-
-    def display_early_logs(self):
-        """Display any logs that were generated before the UI was fully set up"""
-        if hasattr(self, '_early_logs') and hasattr(self, 'log_text'):
-            for message in self._early_logs:
-                try:
-                    self.log_text.config(state="normal")
-                    self.log_text.insert(tk.END, message + "\n")
-                    self.log_text.see(tk.END)
-                    self.log_text.config(state="disabled")
-                except Exception as e:
-                    print(f"Error displaying early log: {e}")
-            self._early_logs = []
+            self.run_command_async(["logout"], self.process_logout, check_error=False)
+
+    def process_logout(self, result):
+        if "successfully logged out" in result.lower():
+            self.is_logged_in = False
+            self.log("Successfully logged out")
+            messagebox.showinfo("Logged Out", "You have been logged out from AdGuard VPN")
+        else:
+            self.log(f"Logout error: {result}", "error")
+            messagebox.showerror("Logout Error", "Could not log out properly. See logs for details.")
+
+    # State snapshot methods
+    def restore_snapshot(self):
+        """Render the last known state from the snapshot, marked as stale until refreshed"""
+        sections = self.snapshot.load()
+        if not sections:
+            return
+        self.log("Showing last known state while refreshing...")
+        
+        status = sections.get("status")
+        if status:
+            self.show_cached_status(status, sections.get("ip"))
+        # The other tabs restore their sections when they are built
+
+    def restore_cached_locations(self):
+        locations = self.snapshot.get("locations")
+        if locations and not len(self.location_model):
+            self.apply_locations([cli_parser.Location(*values) for values in locations], stale=True)
+
+    def restore_cached_settings(self):
+        settings = self.snapshot.get("settings")
+        if settings:
+            self.show_settings(cli_parser.ConfigSnapshot(**settings))
+            self.mark_stale(self.socks_port_entry, self.socks_host_entry, self.dns_entry)
+
+    def restore_cached_exclusions(self):
+        exclusions = self.snapshot.get("exclusions")
+        if exclusions:
+            self.show_exclusions(cli_parser.ExclusionSet(exclusions["mode"], exclusions["sites"]))
+            self.mark_stale(self.exclusions_listbox)
+
+    def restore_cached_version(self):
+        version = self.snapshot.get("cli_version")
+        if version:
+            self.cli_version_label.config(text=f"CLI Version: {version}")
+            self.mark_stale(self.cli_version_label)
+
+    def show_cached_status(self, status, ip=None):
+        if status.get("connected"):
+            self.view.update(
+                status_text="Status: Connected (last known)",
+                button_text="Disconnect",
+                location=status.get("location") or "Unknown location",
+                protocol=f"{status.get('protocol')} ({status.get('interface')})",
+                ip=ip or "Not connected"
+            )
+        else:
+            self.view.update(status_text="Status: Disconnected (last known)")
+        self.view.update(stale=True)
+
+    def remember_state(self, section, value):
+        """Record a piece of UI state and save the snapshot shortly afterwards"""
+        if self.snapshot.update(section, value) and self._snapshot_save_id is None:
+            self._snapshot_save_id = self.root.after(SNAPSHOT_SAVE_DELAY_MS, self.save_snapshot)
+
+    def save_snapshot(self):
+        if self._snapshot_save_id is not None:
+            self.root.after_cancel(self._snapshot_save_id)
+            self._snapshot_save_id = None
+        try:
+            self.snapshot.save()
+        except OSError as e:
+            self.log(f"Could not save state snapshot: {e}", "warn")
+
+    def mark_stale(self, *widgets):
+        """Grey out widgets showing values that have not been confirmed yet"""
+        for widget in widgets:
+            if widget not in self._stale_widgets:
+                self._stale_widgets[widget] = widget.cget("fg")
+                widget.config(fg=STALE_COLOR)
+
+    def mark_fresh(self, *widgets):
+        for widget in widgets:
+            fg = self._stale_widgets.pop(widget, None)
+            if fg is not None:
+                widget.config(fg=fg)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,26 @@
+"""Where the GUI keeps its files, and settings read from the environment."""
+import os
+
+
+APP_DIR_NAME = "adguard-vpn-gui"
+
+
+def state_dir():
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, APP_DIR_NAME)
+
+
+def cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, APP_DIR_NAME)
+
+
+def list_from_env(name, default):
+    """Return the space or comma separated items of variable name, or default if it is unset or empty"""
+    value = os.environ.get(name, "")
+    items = tuple(item for item in value.replace(",", " ").split() if item)
+    return items or tuple(default)
+
+
+def flag_from_env(name):
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes")
@@ -0,0 +1,117 @@
+"""Check cli_parser against the golden corpus and report parse time per kilobyte.
+
+Usage:
+    python benchmarks/bench_parser.py            # verify goldens, then benchmark
+    python benchmarks/bench_parser.py --update   # rewrite golden.json from the current parser
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import cli_parser  # noqa: E402
+
+CORPUS_DIR = os.path.join(HERE, "corpus")
+GOLDEN_PATH = os.path.join(CORPUS_DIR, "golden.json")
+
+
+def summarize_status(text):
+    status = cli_parser.parse_status(text)
+    return {
+        "connected": status.connected,
+        "location": status.location,
+        "protocol": status.protocol,
+        "interface": status.interface,
+        "logged_out": status.logged_out,
+        "disconnected": status.disconnected,
+        "ip": cli_parser.find_ipv4(text),
+    }
+
+
+def summarize_locations(text):
+    return [list(location.values()) + [location.ping_ms] for location in cli_parser.parse_locations(text)]
+
+
+def summarize_config(text):
+    return cli_parser.parse_config(text).as_dict()
+
+
+def summarize_exclusions(text):
+    exclusions = cli_parser.parse_exclusions(text)
+    return {"mode": exclusions.mode, "sites": exclusions.sites}
+
+
+PARSERS = {
+    "status": summarize_status,
+    "list_locations": summarize_locations,
+    "config": summarize_config,
+    "exclusions": summarize_exclusions,
+}
+
+
+def load_corpus():
+    corpus = {}
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if name.endswith(".txt"):
+            with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as f:
+                corpus[name] = f.read()
+    return corpus
+
+
+def parser_for(name):
+    for prefix, parser in PARSERS.items():
+        if name.startswith(prefix):
+            return parser
+    raise KeyError(f"No parser registered for corpus file {name}")
+
+
+def check_goldens(corpus, update=False):
+    results = {name: parser_for(name)(text) for name, text in corpus.items()}
+    if update:
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Wrote {len(results)} goldens to {GOLDEN_PATH}")
+        return True
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        goldens = json.load(f)
+    ok = True
+    for name, result in results.items():
+        if json.loads(json.dumps(result)) != goldens.get(name):
+            print(f"MISMATCH {name}: {result!r}")
+            ok = False
+    print(f"Golden check: {'ok' if ok else 'FAILED'} ({len(results)} files)")
+    return ok
+
+
+def benchmark(corpus, iterations):
+    print(f"{'file':<32}{'bytes':>8}{'us/parse':>12}{'us/KB':>10}")
+    for name, text in corpus.items():
+        parser = parser_for(name)
+        size = len(text.encode("utf-8"))
+        start = time.perf_counter()
+        for _ in range(iterations):
+            parser(text)
+        per_parse = (time.perf_counter() - start) / iterations * 1e6
+        print(f"{name:<32}{size:>8}{per_parse:>12.1f}{per_parse / (size / 1024):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="rewrite the golden file")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    if not check_goldens(corpus, args.update):
+        sys.exit(1)
+    benchmark(corpus, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
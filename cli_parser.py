@@ -0,0 +1,154 @@
+"""Parsers for AdGuard VPN CLI output.
+
+All patterns are compiled once at import time and every parser walks its
+input a single time, returning small __slots__ records.
+"""
+import re
+
+
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+CONNECTED = re.compile(r'Connected to (.*?) in (.*?) mode, running on (\S*)')
+COLUMN_SPLIT = re.compile(r'\s{2,}')
+CONFIG_FIELD = re.compile(
+    r'(VPN mode|SOCKS port|SOCKS host|DNS server|Update channel|VPN location|VPN protocol'
+    r'|IP Address|External IP|VPN IP):[ \t]*([^\r\n]*)'
+)
+IPV4 = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
+
+LOGGED_OUT_MARKERS = ("you must log in", "you are not logged in")
+CONFIG_ATTRIBUTES = {
+    "VPN mode": "mode",
+    "SOCKS port": "socks_port",
+    "SOCKS host": "socks_host",
+    "DNS server": "dns",
+    "Update channel": "update_channel",
+    "VPN location": "location",
+    "VPN protocol": "protocol",
+    "IP Address": "ip",
+    "External IP": "ip",
+    "VPN IP": "ip",
+}
+
+
+def strip_ansi(text):
+    return ANSI_ESCAPE.sub('', text)
+
+
+class StatusInfo:
+    """Parsed output of `status`"""
+    __slots__ = ("connected", "location", "protocol", "interface", "logged_out", "text")
+
+    def __init__(self, connected=False, location="", protocol="", interface="", logged_out=False, text=""):
+        self.connected = connected
+        self.location = location
+        self.protocol = protocol
+        self.interface = interface
+        self.logged_out = logged_out
+        self.text = text
+
+    @property
+    def disconnected(self):
+        return "VPN is disconnected" in self.text
+
+    @property
+    def has_error(self):
+        return "error" in self.text.lower()
+
+    def key(self):
+        """Hashable summary used to detect state changes between polls"""
+        if self.connected:
+            return ("connected", self.location, self.protocol, self.interface)
+        return ("disconnected",)
+
+
+class Location:
+    """One row of `list-locations`"""
+    __slots__ = ("iso", "country", "city", "ping", "ping_ms")
+
+    def __init__(self, iso, country, city, ping):
+        self.iso = iso
+        self.country = country
+        self.city = city
+        self.ping = ping
+        self.ping_ms = int(ping) if ping.isdigit() else None
+
+    def values(self):
+        return (self.iso, self.country, self.city, self.ping)
+
+
+class ConfigSnapshot:
+    """Fields of `config show` that the GUI cares about"""
+    __slots__ = ("mode", "socks_port", "socks_host", "dns", "update_channel", "location", "protocol", "ip")
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ExclusionSet:
+    """Parsed output of `site-exclusions show`"""
+    __slots__ = ("mode", "sites")
+
+    def __init__(self, mode=None, sites=None):
+        self.mode = mode
+        self.sites = sites if sites is not None else []
+
+
+def parse_status(text):
+    clean = strip_ansi(text)
+    lowered = clean.lower()
+    logged_out = any(marker in lowered for marker in LOGGED_OUT_MARKERS)
+    match = CONNECTED.search(clean)
+    if match and "VPN is disconnected" not in clean:
+        location = match.group(1).strip() or "Unknown location"
+        return StatusInfo(True, location, match.group(2).strip(), match.group(3).strip(), logged_out, clean)
+    return StatusInfo(False, logged_out=logged_out, text=clean)
+
+
+def parse_locations(text):
+    locations = []
+    header_found = False
+    for line in strip_ansi(text).splitlines():
+        if not header_found:
+            header_found = "ISO" in line and "COUNTRY" in line
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        # The CLI separates columns with two or more spaces
+        columns = COLUMN_SPLIT.split(line)
+        if len(columns) >= 4:
+            locations.append(Location(columns[0], columns[1], columns[2], columns[3]))
+    return locations
+
+
+def parse_config(text):
+    fields = {}
+    for match in CONFIG_FIELD.finditer(strip_ansi(text)):
+        value = match.group(2).strip()
+        name = CONFIG_ATTRIBUTES[match.group(1)]
+        if value or name not in fields:
+            fields[name] = value
+    return ConfigSnapshot(**fields)
+
+
+def parse_exclusions(text):
+    exclusions = ExclusionSet()
+    for line in strip_ansi(text).splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if "Exclusion mode:" in line:
+            exclusions.mode = line.split("Exclusion mode:", 1)[1].strip()
+        elif "Site exclusions:" not in line:
+            exclusions.sites.append(line)
+    return exclusions
+
+
+def find_ipv4(text):
+    """Return the first IPv4 address in text, or None"""
+    match = IPV4.search(strip_ansi(text))
+    return match.group(0) if match else None
@@ -0,0 +1,278 @@
+import asyncio
+import os
+import threading
+import time
+
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Seconds that a successful result of each read-only command stays valid
+READ_TTLS = {
+    ("status",): 1,
+    ("config", "show"): 60,
+    ("--version",): 3600,
+    ("license",): 3600,
+    ("site-exclusions", "show"): 60,
+    ("list-locations",): 120,
+}
+
+# Mutating commands and the cached reads they make stale. A trailing "*"
+# in a pattern matches any argument with that prefix.
+INVALIDATIONS = (
+    (("config", "set-*"), (("config", "show"),)),
+    (("site-exclusions", "add"), (("site-exclusions", "show"),)),
+    (("site-exclusions", "remove"), (("site-exclusions", "show"),)),
+    (("site-exclusions", "clear"), (("site-exclusions", "show"),)),
+    (("site-exclusions", "mode"), (("site-exclusions", "show"),)),
+    (("connect",), (("status",),)),
+    (("disconnect",), (("status",),)),
+    (("update",), (("--version",), ("license",))),
+    (("login",), tuple(READ_TTLS)),
+    (("logout",), tuple(READ_TTLS)),
+)
+
+
+def matches_pattern(args, pattern):
+    if len(args) < len(pattern):
+        return False
+    for arg, expected in zip(args, pattern):
+        if expected.endswith("*"):
+            if not arg.startswith(expected[:-1]):
+                return False
+        elif arg != expected:
+            return False
+    return True
+
+
+class CommandResult:
+    """Outcome of a single CLI invocation"""
+    __slots__ = ("argv", "returncode", "stdout", "stderr", "duration")
+
+    def __init__(self, argv, returncode, stdout="", stderr="", duration=0.0):
+        self.argv = argv
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+
+class ReadCache:
+    """TTL cache for read-only CLI commands with rule-driven invalidation.
+
+    Keys are argument tuples without the executable. Only successful results
+    are stored. Hits, misses and coalesced requests (ones that joined a read
+    already running) are counted per command so TTLs can be tuned; only
+    hits and misses depend on the TTL, so the hit rate leaves coalesced out.
+    """
+
+    def __init__(self, ttls=READ_TTLS, invalidations=INVALIDATIONS, clock=time.monotonic):
+        self.ttls = dict(ttls)
+        self.invalidations = invalidations
+        self.clock = clock
+        self.entries = {}
+        self.hits = {}
+        self.misses = {}
+        self.coalesced = {}
+        # Bumped whenever a key is invalidated, so results of reads started
+        # before the mutation are neither stored nor shared
+        self.generations = {}
+
+    def is_cacheable(self, args):
+        return tuple(args) in self.ttls
+
+    def get(self, args):
+        """Return the cached result for args, or None; the caller records the miss"""
+        key = tuple(args)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > self.clock():
+            self.hits[key] = self.hits.get(key, 0) + 1
+            return entry[1]
+        self.entries.pop(key, None)
+        return None
+
+    def record_miss(self, args, coalesced=False):
+        """Count a read that was not answered from the cache"""
+        counts = self.coalesced if coalesced else self.misses
+        key = tuple(args)
+        counts[key] = counts.get(key, 0) + 1
+
+    def generation(self, args):
+        return self.generations.get(tuple(args), 0)
+
+    def put(self, args, result, generation=None):
+        """Store a successful read, unless its key was invalidated since generation"""
+        key = tuple(args)
+        if generation is not None and generation != self.generation(key):
+            return
+        if result.ok and key in self.ttls:
+            self.entries[key] = (self.clock() + self.ttls[key], result)
+
+    def invalidate_for(self, args):
+        """Evict every cached read that a mutating command makes stale and return their keys"""
+        stale = set()
+        for pattern, evicts in self.invalidations:
+            if matches_pattern(args, pattern):
+                stale.update(evicts)
+        for key in stale:
+            self.entries.pop(key, None)
+            self.generations[key] = self.generations.get(key, 0) + 1
+        return stale
+
+    def clear(self):
+        self.entries.clear()
+
+    def hit_rates(self):
+        """Return {command: (hits, misses, coalesced, hit rate)}"""
+        rates = {}
+        for key in set(self.hits) | set(self.misses) | set(self.coalesced):
+            hits = self.hits.get(key, 0)
+            misses = self.misses.get(key, 0)
+            lookups = hits + misses
+            rates[" ".join(key)] = (hits, misses, self.coalesced.get(key, 0), hits / lookups if lookups else 0.0)
+        return rates
+
+    def stats_summary(self):
+        rates = self.hit_rates()
+        if not rates:
+            return "no cached reads yet"
+        return ", ".join(f"{name}: {hits}/{hits + misses} ({rate:.0%}), {coalesced} coalesced"
+                         for name, (hits, misses, coalesced, rate) in sorted(rates.items()))
+
+
+class CommandEngine:
+    """Runs CLI processes on a private asyncio loop with a concurrency cap.
+
+    The loop lives in a single daemon thread next to the Tk mainloop, so the
+    number of threads stays flat no matter how many commands are queued.
+    Commands beyond the cap wait on a semaphore instead of spawning.
+    argv[0] is the executable; read-only commands are answered from the
+    ReadCache when possible, and concurrent identical reads are coalesced
+    into one process. coalesced counts the processes saved that way.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, cache=None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.cache = cache if cache is not None else ReadCache()
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._running = set()
+        self._in_flight = {}
+        self.coalesced = 0
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="cli-engine", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+
+    def submit(self, argv, timeout=None, use_cache=True):
+        """Schedule argv and return a concurrent.futures.Future of its CommandResult"""
+        return asyncio.run_coroutine_threadsafe(self._dispatch(list(argv), timeout, use_cache), self._loop)
+
+    def submit_coroutine(self, coroutine):
+        """Schedule any other I/O coroutine on the engine loop instead of a thread of its own"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def _dispatch(self, argv, timeout, use_cache):
+        args = argv[1:]
+        if not self.cache.is_cacheable(args):
+            # A mutation: evict before running so nothing stale is served meanwhile,
+            # and again afterwards in case a read refilled the cache in between
+            self._invalidate(args)
+            result = await self._execute(argv, timeout)
+            self._invalidate(args)
+            return result
+
+        if use_cache:
+            cached = self.cache.get(args)
+            if cached is not None:
+                return cached
+
+        # Single flight: identical reads already running share that process
+        key = tuple(argv)
+        generation = self.cache.generation(args)
+        flight = self._in_flight.get(key)
+        if flight is not None and flight[1] == generation:
+            self.coalesced += 1
+            self.cache.record_miss(args, coalesced=True)
+            return await asyncio.shield(flight[0])
+
+        if use_cache:
+            self.cache.record_miss(args)
+        task = self._loop.create_task(self._execute(argv, timeout))
+        self._in_flight[key] = (task, generation)
+
+        def finished(done):
+            # A newer read may have replaced this one after an invalidation
+            if self._in_flight.get(key, (None,))[0] is done:
+                del self._in_flight[key]
+
+        task.add_done_callback(finished)
+        result = await asyncio.shield(task)
+        self.cache.put(args, result, generation)
+        return result
+
+    def _invalidate(self, args):
+        stale = self.cache.invalidate_for(args)
+        if stale:
+            # Reads already running may predate the mutation; later callers start afresh
+            for key in [key for key in self._in_flight if key[1:] in stale]:
+                del self._in_flight[key]
+
+    async def _execute(self, argv, timeout):
+        async with self._semaphore:
+            start = time.monotonic()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *argv,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=os.environ.copy()
+                )
+            except Exception as e:
+                return CommandResult(argv, -1, "", str(e), time.monotonic() - start)
+
+            self._running.add(process)
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    # It exited between the timeout firing and the kill
+                    pass
+                await process.wait()
+                return CommandResult(argv, -1, "", f"Timed out after {timeout}s", time.monotonic() - start)
+            finally:
+                self._running.discard(process)
+
+            return CommandResult(
+                argv,
+                process.returncode,
+                stdout.decode(errors="replace"),
+                stderr.decode(errors="replace"),
+                time.monotonic() - start
+            )
+
+    def shutdown(self):
+        """Kill any running commands and stop the loop"""
+        def stop():
+            for process in list(self._running):
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+            self._loop.stop()
+
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(stop)
+            self._thread.join(timeout=2)
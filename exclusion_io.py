@@ -0,0 +1,216 @@
+"""Bulk import and export of site exclusions.
+
+Imports read the file as a stream, so large lists are never held in memory
+as a whole. Plain domain lists, hosts files and adblock-style lists are
+understood. New sites are added through the CLI in batches, one batch at a
+time, so the import can report progress and be cancelled between batches.
+The file is read a bounded number of lines per step, so even a long run of
+duplicates or invalid lines never blocks the caller's thread for long.
+"""
+import os
+
+from exclusion_set import normalize
+
+
+IMPORT_BATCH_SIZE = 100
+IMPORT_LINES_PER_STEP = 2000
+
+# Names in hosts files that never make sense as exclusions
+HOSTS_IGNORED = {
+    "localhost", "localhost.localdomain", "local", "broadcasthost",
+    "ip6-localhost", "ip6-loopback", "ip6-localnet", "ip6-mcastprefix",
+    "ip6-allnodes", "ip6-allrouters", "ip6-allhosts", "0.0.0.0",
+}
+
+
+def is_address(token):
+    return ":" in token or token.replace(".", "").isdigit()
+
+
+def parse_adblock_rule(line):
+    """Return the domain of a `||domain^` blocking rule, or None for anything else"""
+    if not line.startswith("||"):
+        # Exceptions (@@), cosmetic rules (##), regexes and URL parts are not exclusions
+        return None
+    rule = line[2:].split("$", 1)[0]
+    domain = rule.split("^", 1)[0].split("/", 1)[0]
+    return domain or None
+
+
+def parse_line(line):
+    """Return the domains named on one line of any supported list format"""
+    line = line.strip()
+    if not line or line[0] in "#!;[":
+        return []
+    if line.startswith(("||", "@@", "/", "-")) or "##" in line or "#@#" in line:
+        domain = parse_adblock_rule(line)
+        return [domain] if domain else []
+
+    tokens = line.split("#", 1)[0].split()
+    if len(tokens) > 1 and is_address(tokens[0]):
+        # hosts file: address followed by one or more names
+        return [token for token in tokens[1:] if token not in HOSTS_IGNORED]
+    if len(tokens) == 1:
+        return tokens
+    return []
+
+
+class ImportReader:
+    """Streams domains from a list file and tracks how much of it has been read"""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.bytes_read = 0
+        self.lines = 0
+        self.rejected = 0
+        self.finished = False
+
+    def read(self, max_lines):
+        """Return the normalized domains on the next max_lines lines"""
+        domains = []
+        for _ in range(max_lines):
+            raw = self.file.readline()
+            if not raw:
+                self.finished = True
+                break
+            self.bytes_read += len(raw)
+            self.lines += 1
+            for domain in parse_line(raw.decode("utf-8", errors="replace")):
+                canonical = normalize(domain)
+                if canonical is None:
+                    # Ranges, paths and ports are not imported rather than changed
+                    self.rejected += 1
+                else:
+                    domains.append(canonical)
+        return domains
+
+    def close(self):
+        self.file.close()
+
+    @property
+    def fraction(self):
+        return self.bytes_read / self.size if self.size else 1.0
+
+
+class ExclusionImport:
+    """Adds every new site from a list file through run(args, callback).
+
+    existing is the set of sites the CLI already has; those and repeats
+    within the file are skipped after normalization. on_progress is called with this import
+    after every batch or read step, and on_done once it has finished or was cancelled.
+    defer(func) must call func later, after pending UI events (Tk's after_idle),
+    and is used to continue reading when a step found too few new sites.
+    """
+
+    def __init__(self, run, path, existing, on_progress, on_done, defer,
+                 batch_size=IMPORT_BATCH_SIZE, lines_per_step=IMPORT_LINES_PER_STEP):
+        self.run = run
+        self.defer = defer
+        self.reader = ImportReader(path)
+        self.seen = {normalize(site) or site for site in existing}
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.batch_size = batch_size
+        self.lines_per_step = lines_per_step
+        self.added = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+        self.cancelled = False
+        self._pending = []
+
+    def start(self):
+        self._next_batch()
+
+    def cancel(self):
+        """Stop before the next batch; the batch already running completes"""
+        self.cancelled = True
+
+    def _read_step(self):
+        for domain in self.reader.read(self.lines_per_step):
+            if domain in self.seen:
+                self.skipped += 1
+                continue
+            self.seen.add(domain)
+            self._pending.append(domain)
+
+    def _next_batch(self):
+        if not self.cancelled and len(self._pending) < self.batch_size and not self.reader.finished:
+            self._read_step()
+            if len(self._pending) < self.batch_size and not self.reader.finished:
+                # Not a full batch yet; read on after the UI has had its turn
+                self.on_progress(self)
+                self.defer(self._next_batch)
+                return
+
+        batch = [] if self.cancelled else self._pending[:self.batch_size]
+        del self._pending[:len(batch)]
+        if not batch:
+            self.reader.close()
+            self.on_done(self)
+            return
+
+        def finished(result):
+            if result.ok:
+                self.added += len(batch)
+            else:
+                self.failed += len(batch)
+                self.errors.append((result.stderr or result.stdout).strip())
+            self.on_progress(self)
+            self._next_batch()
+
+        self.run(["site-exclusions", "add", *batch], finished)
+
+    def summary(self):
+        text = f"{self.added} sites added, {self.skipped} duplicates skipped"
+        if self.reader.rejected:
+            text += f", {self.reader.rejected} unsupported entries skipped"
+        if self.failed:
+            text += f", {self.failed} failed"
+        if self.cancelled:
+            text += " (cancelled)"
+        return text
+
+
+class ExclusionChange:
+    """Removes and then adds sites through run(args, callback), a batch per CLI call.
+
+    on_done is called with this change once every batch has run.
+    """
+
+    def __init__(self, run, remove=(), add=(), on_done=None, batch_size=IMPORT_BATCH_SIZE):
+        self.run = run
+        self.on_done = on_done
+        remove = list(remove)
+        add = list(add)
+        self.batches = [("remove", remove[i:i + batch_size]) for i in range(0, len(remove), batch_size)]
+        self.batches += [("add", add[i:i + batch_size]) for i in range(0, len(add), batch_size)]
+        self.failed = 0
+        self.errors = []
+
+    def start(self):
+        self._next_batch(0)
+
+    def _next_batch(self, index):
+        if index == len(self.batches):
+            if self.on_done:
+                self.on_done(self)
+            return
+        verb, sites = self.batches[index]
+
+        def finished(result):
+            if not result.ok:
+                self.failed += len(sites)
+                self.errors.append((result.stderr or result.stdout).strip())
+            self._next_batch(index + 1)
+
+        self.run(["site-exclusions", verb, *sites], finished)
+
+
+def export_exclusions(path, sites):
+    """Write sites as a plain list, one per line"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# AdGuard VPN site exclusions\n")
+        for site in sites:
+            f.write(f"{site}\n")
@@ -0,0 +1,50 @@
+"""Python-side model for the exclusions list.
+
+Sites are kept in one sorted array with casefolded search keys computed up
+front. Filtering is incremental: when the new search term contains the
+previous one, only the previous matches can still match, so typing a
+longer term narrows the match list rather than rescanning every site.
+"""
+
+
+class ExclusionModel:
+    def __init__(self):
+        self.sites = []
+        self.keys = []
+        self.term = ""
+        self.matches = []
+
+    def __len__(self):
+        """Number of sites matching the current filter"""
+        return len(self.matches)
+
+    def load(self, sites):
+        """Replace the contents, keeping the current filter"""
+        term = self.term
+        pairs = sorted((site.casefold(), site) for site in set(sites))
+        self.keys = [key for key, _ in pairs]
+        self.sites = [site for _, site in pairs]
+        self.term = ""
+        self.matches = list(range(len(self.sites)))
+        return self.filter(term)
+
+    def filter(self, term):
+        """Apply a substring filter and return the number of matches"""
+        term = term.strip().casefold()
+        if not term:
+            self.matches = list(range(len(self.sites)))
+        else:
+            candidates = self.matches if self.term and self.term in term else range(len(self.sites))
+            keys = self.keys
+            self.matches = [index for index in candidates if term in keys[index]]
+        self.term = term
+        return len(self.matches)
+
+    def matches_filter(self, site):
+        """Whether site matches the current filter"""
+        return not self.term or self.term in site.casefold()
+
+    def window(self, start, count):
+        """Return the matching sites at positions start to start + count"""
+        sites = self.sites
+        return [sites[index] for index in self.matches[start:start + count]]
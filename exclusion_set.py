@@ -0,0 +1,187 @@
+"""Normalization and minimization of site exclusion lists.
+
+Entries are normalized to a lowercase ASCII host name, optionally prefixed
+with "*." for a wildcard, and stored in a trie keyed on reversed labels
+(com -> example -> www). Walking an entry's labels from the top-level
+domain down meets every broader entry that covers it, so redundant entries
+are found in time proportional to the number of labels.
+
+By default only "*." entries cover subdomains, so a minimized list never
+matches less traffic than the original even if the CLI matches plain
+entries exactly. Treating "example.com" as covering its subdomains as
+well is an opt-in, through plain_covers_subdomains or PLAIN_COVERS_ENV.
+"""
+import re
+
+from addresses import is_ip
+from app_env import flag_from_env
+
+
+# Set to 1 to let a plain entry cover its subdomains when minimizing
+PLAIN_COVERS_ENV = "ADGUARD_VPN_GUI_PLAIN_COVERS_SUBDOMAINS"
+WILDCARD = "*."
+LABEL = re.compile(r'^(?!-)[a-z0-9_-]{1,63}(?<!-)$')
+
+
+def normalize(entry):
+    """Return the canonical form of an exclusion, or None if it cannot be rewritten safely.
+
+    Only rewrites that match the same traffic are made: "EXAMPLE.com/",
+    "https://example.com" and "example.com." all become "example.com", and
+    "*.Example.com" becomes "*.example.com". Address ranges such as
+    "192.168.0.0/16", paths, explicit ports and user names change what an
+    entry matches, so those entries are rejected rather than rewritten.
+    """
+    text = entry.strip().lower()
+    if "://" in text:
+        text = text.split("://", 1)[1]
+    # A trailing slash is an empty path; anything after one narrows the entry
+    text = text.rstrip("/")
+    if any(char in text for char in "/?#@"):
+        return None
+
+    if text.startswith("["):
+        if not text.endswith("]"):
+            return None
+        text = text[1:-1]
+        return text if is_ip(text) else None
+    if is_ip(text):
+        return text
+    if ":" in text:
+        return None
+
+    wildcard = text.startswith(WILDCARD)
+    if wildcard:
+        text = text[len(WILDCARD):]
+    text = text.strip(".")
+    if not text.isascii():
+        try:
+            text = text.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    if not text or len(text) > 253 or not all(LABEL.match(label) for label in text.split(".")):
+        return None
+    return WILDCARD + text if wildcard else text
+
+
+class _Node:
+    __slots__ = ("children", "plain", "wildcard")
+
+    def __init__(self):
+        self.children = {}
+        self.plain = False
+        self.wildcard = False
+
+
+class DomainTrie:
+    """Normalized entries stored by reversed labels"""
+
+    def __init__(self, entries=(), plain_covers_subdomains=False):
+        self.plain_covers_subdomains = plain_covers_subdomains
+        self.root = _Node()
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        wildcard = entry.startswith(WILDCARD)
+        host = entry[len(WILDCARD):] if wildcard else entry
+        node = self.root
+        for label in reversed(host.split(".")):
+            node = node.children.setdefault(label, _Node())
+        if wildcard:
+            node.wildcard = True
+        else:
+            node.plain = True
+
+    def covering(self, entry):
+        """Return the broadest other entry that already covers entry, or None"""
+        wildcard = entry.startswith(WILDCARD)
+        host = entry[len(WILDCARD):] if wildcard else entry
+        labels = host.split(".")
+        node = self.root
+        for depth, label in enumerate(reversed(labels[1:]), 1):
+            node = node.children.get(label)
+            if node is None:
+                return None
+            parent = ".".join(labels[-depth:])
+            if node.plain and self.plain_covers_subdomains:
+                return parent
+            if node.wildcard:
+                return WILDCARD + parent
+        node = node.children.get(labels[0])
+        if wildcard and node is not None and node.plain and self.plain_covers_subdomains:
+            return host
+        return None
+
+
+class ExclusionPlan:
+    """A minimal equivalent exclusion list and the changes that lead to it.
+
+    keep holds the minimal set in the original order. covered maps each
+    redundant original entry to the entry that covers it, rewritten maps
+    non-canonical entries to their normalized form, and invalid lists
+    entries that cannot be rewritten safely, such as ranges, paths and
+    ports (these are left alone). remove and add
+    are the exact CLI changes needed. plain_covers_subdomains defaults to
+    the PLAIN_COVERS_ENV setting.
+    """
+
+    def __init__(self, entries, plain_covers_subdomains=None):
+        if plain_covers_subdomains is None:
+            plain_covers_subdomains = flag_from_env(PLAIN_COVERS_ENV)
+        self.entries = list(entries)
+        self.keep = []
+        self.covered = {}
+        self.rewritten = {}
+        self.invalid = []
+
+        normalized = {}
+        for entry in self.entries:
+            canonical = normalize(entry)
+            if canonical is None:
+                self.invalid.append(entry)
+                continue
+            if canonical != entry:
+                self.rewritten[entry] = canonical
+            if canonical not in normalized:
+                normalized[canonical] = entry
+            elif entry == canonical:
+                # Prefer the entry already in canonical form, so it is the one kept
+                self.covered[normalized[canonical]] = canonical
+                normalized[canonical] = entry
+            else:
+                self.covered[entry] = canonical
+
+        hosts = [canonical for canonical in normalized if not is_ip(canonical)]
+        trie = DomainTrie(hosts, plain_covers_subdomains)
+        for canonical, entry in normalized.items():
+            cover = None if is_ip(canonical) else trie.covering(canonical)
+            if cover is None:
+                self.keep.append(canonical)
+            else:
+                self.covered[entry] = cover
+        for entry, cover in self.covered.items():
+            # A duplicate of an entry that is itself covered points at the final cover
+            first = normalized.get(cover)
+            if first is not None and first != entry and first in self.covered:
+                self.covered[entry] = self.covered[first]
+
+        present = set(self.entries)
+        kept = set(self.keep)
+        self.remove = [entry for entry in self.entries if entry not in kept and entry not in self.invalid]
+        self.add = [canonical for canonical in self.keep if canonical not in present]
+
+    @property
+    def changed(self):
+        return bool(self.remove or self.add)
+
+    def describe(self, limit=15):
+        """Return a short human-readable summary of the proposed changes"""
+        lines = [f"{len(self.entries)} exclusions can be reduced to {len(self.keep) + len(self.invalid)}."]
+        details = [f"{entry} (covered by {cover})" for entry, cover in self.covered.items()]
+        details += [f"{entry} -> {canonical}" for entry, canonical in self.rewritten.items()
+                    if entry not in self.covered]
+        lines += details[:limit]
+        if len(details) > limit:
+            lines.append(f"... and {len(details) - limit} more")
+        return "\n".join(lines)
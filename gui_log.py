@@ -0,0 +1,190 @@
+"""Logging support for the GUI log pane and the on-disk log."""
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+
+
+from app_env import state_dir
+
+
+LEVELS = {"debug": 10, "info": 20, "warn": 30, "error": 40}
+# Options whose value must never reach the log pane or the log files
+SECRET_OPTIONS = ("--password",)
+
+
+def mask_secrets(argv):
+    """Return argv as one string with the values of SECRET_OPTIONS masked"""
+    masked = list(argv)
+    for index, arg in enumerate(masked[:-1]):
+        if arg in SECRET_OPTIONS:
+            masked[index + 1] = "****"
+    for index, arg in enumerate(masked):
+        option, sep, _ = arg.partition("=")
+        if sep and option in SECRET_OPTIONS:
+            masked[index] = f"{option}=****"
+    return " ".join(masked)
+
+
+class LogBuffer:
+    """Fixed-capacity, thread-safe buffer of log lines waiting to be rendered.
+
+    Any thread may append; the Tk thread drains everything in one go on its
+    flush tick. When more lines arrive between flushes than fit, the oldest
+    are dropped and counted.
+    """
+
+    def __init__(self, capacity=2000):
+        self.lines = deque(maxlen=capacity)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def append(self, line):
+        with self._lock:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(line)
+
+    def drain(self):
+        """Return (lines, dropped) and reset the buffer"""
+        with self._lock:
+            lines = list(self.lines)
+            dropped = self.dropped
+            self.lines.clear()
+            self.dropped = 0
+        return lines, dropped
+
+
+class LogFolder:
+    """Folds runs of identical consecutive lines into one "line (xN)" entry.
+
+    fold() returns (replace_last, rendered, output). rendered holds the lines
+    for the log pane; when replace_last is set, rendered[0] replaces the last
+    line already shown there. output holds the lines for append-only sinks
+    such as the console, with a note when a run of repeats ends.
+    """
+
+    def __init__(self):
+        self.last = None
+        self.count = 0
+
+    def _folded(self):
+        return f"{self.last} (x{self.count})"
+
+    def _close_run(self, output):
+        if self.count > 1:
+            output.append(f"(previous message repeated {self.count - 1} more times)")
+
+    def fold(self, lines):
+        rendered = []
+        output = []
+        replace_last = False
+        for line in lines:
+            if line == self.last:
+                self.count += 1
+                if rendered:
+                    rendered[-1] = self._folded()
+                else:
+                    replace_last = True
+                    rendered.append(self._folded())
+            else:
+                self._close_run(output)
+                self.last = line
+                self.count = 1
+                rendered.append(line)
+                output.append(line)
+        return replace_last, rendered, output
+
+
+class RotatingLogWriter:
+    """Writes log lines to disk from a background thread.
+
+    write() only puts the line on a queue, so callers never block on file
+    I/O. The file is rotated once it exceeds max_bytes, keeping backup_count
+    older files (gzip-compressed when compress is set).
+    """
+
+    _STOP = object()
+
+    def __init__(self, path=None, max_bytes=1024 * 1024, backup_count=5, compress=True):
+        self.path = path or os.path.join(state_dir(), "gui.log")
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.queue = queue.SimpleQueue()
+        # Set when the file cannot be opened, so lines are dropped instead of queued forever
+        self.disabled = False
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line):
+        if self.disabled:
+            return
+        self.queue.put(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {line}\n")
+
+    def close(self, timeout=2):
+        self.queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            print(f"Disk logging disabled: {e}")
+            self.disabled = True
+            # Free whatever was queued before the flag was seen
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    return
+
+        while True:
+            # Block for one item, then take everything else already queued
+            batch = [self.queue.get()]
+            try:
+                while True:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            stop = self._STOP in batch
+            try:
+                self._file.write("".join(item for item in batch if item is not self._STOP))
+                self._file.flush()
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except OSError as e:
+                print(f"Error writing log file: {e}")
+            if stop:
+                self._file.close()
+                return
+
+    def _backup_name(self, index):
+        return f"{self.path}.{index}.gz" if self.compress else f"{self.path}.{index}"
+
+    def _rotate(self):
+        self._file.close()
+        oldest = self._backup_name(self.backup_count)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self._backup_name(index)
+            if os.path.exists(source):
+                os.replace(source, self._backup_name(index + 1))
+
+        if self.backup_count > 0:
+            if self.compress:
+                with open(self.path, "rb") as source, gzip.open(self._backup_name(1), "wb") as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self._backup_name(1))
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
@@ -0,0 +1,227 @@
+import asyncio
+import ipaddress
+import json
+import ssl
+import time
+from urllib.parse import urlsplit
+
+from app_env import list_from_env
+
+
+class IPCache:
+    """Remembers the resolved IP address for the current connection session.
+
+    Entries are keyed on (session, interface). A miss claims the key, so the
+    caller resolves the address once per connect; results that arrive for
+    an older key are dropped.
+    """
+
+    def __init__(self):
+        self.session = 0
+        self.key = None
+        self.ip = None
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, interface):
+        return (self.session, interface)
+
+    def lookup(self, key):
+        """Return (hit, ip) for key. ip may be None while a lookup is still running"""
+        if key == self.key:
+            self.hits += 1
+            return True, self.ip
+        self.misses += 1
+        self.key = key
+        self.ip = None
+        return False, None
+
+    def store(self, key, ip):
+        """Record ip for key, returning False if the key is no longer current"""
+        if key != self.key:
+            return False
+        self.ip = ip
+        return True
+
+    def invalidate(self):
+        """Forget the cached address and start a new connection session"""
+        if self.key is not None:
+            self.session += 1
+        self.key = None
+        self.ip = None
+
+    def stats_summary(self):
+        return f"{self.hits} hits, {self.misses} misses"
+
+
+DEFAULT_ENDPOINTS = (
+    "https://api.ipify.org/?format=json",
+    "https://httpbin.org/ip",
+    "https://api.myip.com",
+)
+# Space or comma separated URLs that replace DEFAULT_ENDPOINTS
+ENDPOINTS_ENV = "ADGUARD_VPN_GUI_IP_ENDPOINTS"
+# Delay before the next endpoint is started while earlier ones are still
+# running, as in Happy Eyeballs (RFC 8305)
+STAGGER_DELAY = 0.25
+REQUEST_TIMEOUT = 3
+MAX_RESPONSE_BYTES = 64 * 1024
+
+
+def valid_ip(text):
+    try:
+        return str(ipaddress.ip_address(text.strip()))
+    except (ValueError, AttributeError):
+        return None
+
+
+def parse_ip_response(body):
+    """Return the address in a JSON ({"ip": ...} or {"origin": ...}) or plain-text body"""
+    text = body.decode("utf-8", errors="replace").strip()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return valid_ip(text)
+    if isinstance(data, dict):
+        value = data.get("ip") or data.get("origin")
+        # httpbin lists every hop when proxied; the first is the client
+        return valid_ip(value.split(",")[0]) if isinstance(value, str) else None
+    return None
+
+
+def decode_http_response(data):
+    """Return the body of a successful HTTP/1.1 response, or None"""
+    head, _, body = data.partition(b"\r\n\r\n")
+    lines = head.decode("iso-8859-1").split("\r\n")
+    status = lines[0].split()
+    if len(status) < 2 or status[1] != "200":
+        return None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+    if headers.get("transfer-encoding") == "chunked":
+        chunks = []
+        while body:
+            size_line, _, body = body.partition(b"\r\n")
+            size = int(size_line.split(b";")[0], 16)
+            if size == 0:
+                break
+            chunks.append(body[:size])
+            body = body[size + 2:]
+        body = b"".join(chunks)
+    return body
+
+
+class EndpointStats:
+    __slots__ = ("wins", "answers", "failures", "cancelled", "total_latency")
+
+    def __init__(self):
+        self.wins = 0
+        self.answers = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.total_latency = 0.0
+
+    def average_latency(self):
+        return self.total_latency / self.answers if self.answers else None
+
+
+class PublicIPLookup:
+    """Finds the public IP address by racing several HTTP endpoints.
+
+    Endpoints are started one after another, STAGGER_DELAY apart or as soon
+    as the previous one fails. The first valid answer wins and every request
+    still running is cancelled, which closes its connection. race() is a
+    coroutine so it runs on an existing event loop, such as the command
+    engine's, without a thread of its own.
+    """
+
+    def __init__(self, endpoints=None, stagger=STAGGER_DELAY, timeout=REQUEST_TIMEOUT):
+        self.endpoints = tuple(endpoints) if endpoints else list_from_env(ENDPOINTS_ENV, DEFAULT_ENDPOINTS)
+        self.stagger = stagger
+        self.timeout = timeout
+        self.stats = {url: EndpointStats() for url in self.endpoints}
+
+    async def fetch(self, url):
+        """GET url and return the response body, or None if it was not a 200"""
+        parts = urlsplit(url)
+        https = parts.scheme == "https"
+        reader, writer = await asyncio.open_connection(
+            parts.hostname,
+            parts.port or (443 if https else 80),
+            ssl=ssl.create_default_context() if https else None
+        )
+        try:
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: AdGuardVPNGUI\r\n"
+                f"Accept: application/json, text/plain\r\nConnection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            data = b""
+            while len(data) < MAX_RESPONSE_BYTES:
+                chunk = await reader.read(4096)
+                if not chunk:
+                    break
+                data += chunk
+        finally:
+            writer.close()
+        return decode_http_response(data)
+
+    async def _attempt(self, url):
+        stats = self.stats[url]
+        start = time.monotonic()
+        try:
+            body = await asyncio.wait_for(self.fetch(url), self.timeout)
+            ip = parse_ip_response(body) if body is not None else None
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception:
+            ip = None
+        if ip is None:
+            stats.failures += 1
+        else:
+            stats.answers += 1
+            stats.total_latency += time.monotonic() - start
+        return ip
+
+    async def race(self):
+        """Return (ip, url) from the first endpoint with a valid answer, or (None, None)"""
+        waiting = list(self.endpoints)
+        running = {}
+        try:
+            while waiting or running:
+                if waiting:
+                    url = waiting.pop(0)
+                    running[asyncio.ensure_future(self._attempt(url))] = url
+                # Start the next endpoint after the stagger delay, or as soon as one fails
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.stagger if waiting else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    url = running.pop(task)
+                    ip = task.result()
+                    if ip is not None:
+                        self.stats[url].wins += 1
+                        return ip, url
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        return None, None
+
+    def stats_summary(self):
+        parts = []
+        for url, stats in self.stats.items():
+            latency = stats.average_latency()
+            latency = f"{latency * 1000:.0f} ms" if latency is not None else "n/a"
+            parts.append(f"{urlsplit(url).hostname}: {stats.wins} wins, {latency} avg, "
+                         f"{stats.failures} failed, {stats.cancelled} cancelled")
+        return "; ".join(parts)
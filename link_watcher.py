@@ -0,0 +1,159 @@
+"""Background watcher for network link and default-route changes.
+
+A thread listens on an rtnetlink socket subscribed to link and IPv4/IPv6
+route notifications, so the GUI hears about the tunnel interface coming
+up, going down or disappearing, and about default-route changes, as they
+happen instead of at the next status poll.
+"""
+import socket
+import struct
+import threading
+
+from linux_introspect import netlink_supported, parse_attributes, parse_messages
+
+
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_ROUTE = 0x400
+
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_NEWROUTE = 24
+RTM_DELROUTE = 25
+
+IFINFOMSG = struct.Struct("=BxHiII")
+RTMSG = struct.Struct("=BBBBBBBBI")
+IFLA_IFNAME = 3
+RTA_OIF = 4
+IFF_UP = 0x1
+IFF_LOWER_UP = 0x10000
+
+
+class LinkEvent:
+    """kind is "up", "down" or "removed" for a link, or "route" for a default route change"""
+    __slots__ = ("kind", "interface")
+
+    def __init__(self, kind, interface):
+        self.kind = kind
+        self.interface = interface
+
+    def __repr__(self):
+        return f"LinkEvent({self.kind!r}, {self.interface!r})"
+
+
+class LinkWatcher:
+    """Calls on_event(LinkEvent) from its own thread for every relevant change.
+
+    Link events are only reported when an interface's state actually
+    changes, so the flag churn the kernel reports for unrelated reasons is
+    filtered out. Route events are reported for default routes only. If the
+    netlink socket cannot be opened, for instance in a sandbox, on_error is
+    called once with the OSError and the thread ends.
+    """
+
+    def __init__(self, on_event, on_error=None, poll_timeout=1.0):
+        self.on_event = on_event
+        self.on_error = on_error
+        self.poll_timeout = poll_timeout
+        self.links = {}
+        self.events = 0
+        self._names = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def supported():
+        return netlink_supported()
+
+    def start(self):
+        if self._thread is not None or not self.supported():
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="link-watcher", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.poll_timeout * 2)
+            self._thread = None
+
+    def _run(self):
+        groups = RTMGRP_LINK | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            try:
+                sock.bind((0, groups))
+            except OSError:
+                sock.close()
+                raise
+        except OSError as e:
+            if self.on_error:
+                self.on_error(e)
+            return
+        with sock:
+            # Wake up regularly so stop() is noticed
+            sock.settimeout(self.poll_timeout)
+            while not self._stop.is_set():
+                try:
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    # ENOBUFS: notifications were lost, but the next poll catches up
+                    continue
+                for event in self.handle(data):
+                    self.events += 1
+                    self.on_event(event)
+
+    def handle(self, data):
+        """Return the LinkEvents for one batch of netlink messages"""
+        events = []
+        for msg_type, payload in parse_messages(data):
+            if msg_type in (RTM_NEWLINK, RTM_DELLINK) and len(payload) >= IFINFOMSG.size:
+                event = self._link_event(msg_type, payload)
+            elif msg_type in (RTM_NEWROUTE, RTM_DELROUTE) and len(payload) >= RTMSG.size:
+                event = self._route_event(payload)
+            else:
+                event = None
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _link_event(self, msg_type, payload):
+        _, _, index, flags, _ = IFINFOMSG.unpack_from(payload)
+        attributes = parse_attributes(payload, IFINFOMSG.size)
+        name = attributes.get(IFLA_IFNAME, b"").split(b"\0", 1)[0].decode(errors="replace")
+        name = name or self._names.get(index, "")
+        if not name:
+            return None
+        self._names[index] = name
+
+        if msg_type == RTM_DELLINK:
+            self._names.pop(index, None)
+            self.links.pop(name, None)
+            return LinkEvent("removed", name)
+
+        up = bool(flags & IFF_UP) and bool(flags & IFF_LOWER_UP)
+        if self.links.get(name) == up:
+            return None
+        self.links[name] = up
+        return LinkEvent("up" if up else "down", name)
+
+    def _route_event(self, payload):
+        dst_len = RTMSG.unpack_from(payload)[1]
+        if dst_len != 0:
+            return None
+        attributes = parse_attributes(payload, RTMSG.size)
+        oif = attributes.get(RTA_OIF)
+        interface = None
+        if oif is not None and len(oif) == 4:
+            index = struct.unpack("=I", oif)[0]
+            interface = self._names.get(index)
+            if interface is None:
+                try:
+                    interface = socket.if_indextoname(index)
+                except OSError:
+                    pass
+        return LinkEvent("route", interface)
@@ -0,0 +1,155 @@
+"""Interface and process state read straight from the Linux kernel.
+
+Addresses come from an rtnetlink RTM_GETADDR dump and processes from
+/proc, so checking the tunnel never forks `ip` or `ps`. On other systems
+every function reports nothing, and callers fall back to the CLI.
+"""
+import os
+import socket
+import struct
+
+
+NLMSG_HEADER = struct.Struct("=LHHLL")
+RTATTR_HEADER = struct.Struct("=HH")
+IFADDRMSG = struct.Struct("=BBBBI")
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+RT_SCOPE_UNIVERSE = 0
+
+SYS_CLASS_NET = "/sys/class/net"
+PROC = "/proc"
+
+
+def netlink_supported():
+    return hasattr(socket, "AF_NETLINK")
+
+
+def align(length):
+    return (length + 3) & ~3
+
+
+def parse_messages(data):
+    """Yield (type, payload) for every netlink message in data"""
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if length < NLMSG_HEADER.size:
+            break
+        yield msg_type, data[offset + NLMSG_HEADER.size:offset + length]
+        offset += align(length)
+
+
+def parse_attributes(data, offset):
+    """Return {type: value} for the rtattrs in data starting at offset"""
+    attributes = {}
+    while offset + RTATTR_HEADER.size <= len(data):
+        length, attr_type = RTATTR_HEADER.unpack_from(data, offset)
+        if length < RTATTR_HEADER.size:
+            break
+        attributes[attr_type] = data[offset + RTATTR_HEADER.size:offset + length]
+        offset += align(length)
+    return attributes
+
+
+def netlink_dump(msg_type, body):
+    """Send an rtnetlink dump request and yield (type, payload) for each reply"""
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+        sock.bind((0, 0))
+        request = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), msg_type, NLM_F_REQUEST | NLM_F_DUMP, 1, 0)
+        sock.send(request + body)
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return
+            for reply_type, payload in parse_messages(data):
+                if reply_type == NLMSG_DONE:
+                    return
+                if reply_type == NLMSG_ERROR:
+                    raise OSError("rtnetlink dump failed")
+                yield reply_type, payload
+
+
+def interface_addresses(name):
+    """Return (ipv4, ipv6) lists of the global addresses assigned to interface name"""
+    ipv4, ipv6 = [], []
+    if not name or not netlink_supported():
+        return ipv4, ipv6
+    try:
+        index = socket.if_nametoindex(name)
+    except OSError:
+        return ipv4, ipv6
+
+    request = IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+    for msg_type, payload in netlink_dump(RTM_GETADDR, request):
+        if msg_type != RTM_NEWADDR or len(payload) < IFADDRMSG.size:
+            continue
+        family, _, _, scope, if_index = IFADDRMSG.unpack_from(payload)
+        if if_index != index or scope != RT_SCOPE_UNIVERSE:
+            continue
+        attributes = parse_attributes(payload, IFADDRMSG.size)
+        # On point-to-point links such as tun devices IFA_ADDRESS is the peer
+        raw = attributes.get(IFA_LOCAL) or attributes.get(IFA_ADDRESS)
+        if raw is None:
+            continue
+        if family == socket.AF_INET:
+            ipv4.append(socket.inet_ntop(family, raw))
+        elif family == socket.AF_INET6:
+            ipv6.append(socket.inet_ntop(family, raw))
+    return ipv4, ipv6
+
+
+def read_cmdline(pid):
+    with open(os.path.join(PROC, pid, "cmdline"), "rb") as f:
+        return [arg.decode(errors="replace") for arg in f.read().split(b"\0") if arg]
+
+
+def read_stat(pid):
+    """Return (state, parent pid) from /proc/<pid>/stat"""
+    with open(os.path.join(PROC, pid, "stat"), "rb") as f:
+        data = f.read()
+    # The command name is in parentheses and may itself contain spaces or ")"
+    fields = data[data.rindex(b")") + 2:].split()
+    return fields[0].decode(), int(fields[1])
+
+
+def find_processes(executable, exclude_parent=None):
+    """Return the pids of live processes running executable.
+
+    argv[0] must be the executable itself, either the same path or, for a
+    bare command name, the same file name; a substring match is not enough.
+    Zombies and children of exclude_parent (for instance our own short-lived
+    CLI calls) are skipped.
+    """
+    if not os.path.isdir(PROC):
+        return []
+    target = os.path.realpath(executable)
+    name = os.path.basename(executable)
+    pids = []
+    for pid in os.listdir(PROC):
+        if not pid.isdigit():
+            continue
+        try:
+            argv = read_cmdline(pid)
+            if not argv:
+                continue
+            argv0 = argv[0]
+            if os.sep in argv0:
+                if os.path.realpath(argv0) != target:
+                    continue
+            elif argv0 != name:
+                continue
+            state, parent = read_stat(pid)
+        except (OSError, ValueError, IndexError):
+            # The process exited while we were looking at it
+            continue
+        if state == "Z" or (exclude_parent is not None and parent == exclude_parent):
+            continue
+        pids.append(int(pid))
+    return pids
@@ -0,0 +1,151 @@
+"""Python-side model for the locations table.
+
+Rows are kept with their sort keys parsed up front, so sorting never reads
+cells back from the Treeview, and a prefix index over ISO code, country
+and city answers search queries without touching the widget.
+"""
+import re
+
+
+COLUMNS = ("iso", "country", "city", "ping")
+NO_PING = float("inf")
+TOKEN_SPLIT = re.compile(r"[\s,.()'-]+")
+
+
+def location_key(location):
+    """Stable identity of a location, also used as its Treeview item id"""
+    return f"{location.iso}|{location.city}"
+
+
+class LocationEntry:
+    """A location plus its precomputed sort and search keys"""
+    __slots__ = ("key", "location", "sort_keys", "haystack")
+
+    def __init__(self, location):
+        self.key = location_key(location)
+        self.location = location
+        self.sort_keys = {
+            "iso": location.iso.casefold(),
+            "country": location.country.casefold(),
+            "city": location.city.casefold(),
+            "ping": location.ping_ms if location.ping_ms is not None else NO_PING,
+        }
+        self.haystack = " ".join((self.sort_keys["iso"], self.sort_keys["country"], self.sort_keys["city"]))
+
+    def tokens(self):
+        yield self.sort_keys["iso"]
+        for field in ("country", "city"):
+            # Whole field, so "new york" matches as a phrase, plus each word
+            yield self.sort_keys[field]
+            for token in TOKEN_SPLIT.split(self.sort_keys[field]):
+                if token:
+                    yield token
+
+
+class LocationModel:
+    def __init__(self, sort_column="ping", descending=False):
+        self.entries = {}
+        self.order = []
+        self.sort_column = sort_column
+        self.descending = descending
+        self.prefix_index = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        return entry.location if entry else None
+
+    def update(self, locations):
+        """Merge a fresh location list into the model.
+
+        Returns (added, removed, changed) lists of keys so the view can apply
+        just the difference. The index is only rebuilt when names change.
+        """
+        fresh = {}
+        for location in locations:
+            entry = LocationEntry(location)
+            fresh[entry.key] = entry
+
+        removed = [key for key in self.entries if key not in fresh]
+        added = [key for key in fresh if key not in self.entries]
+        changed = []
+        renamed = False
+        for key, entry in fresh.items():
+            old = self.entries.get(key)
+            if old is None:
+                continue
+            old_values = old.location.values()
+            new_values = entry.location.values()
+            if old_values != new_values:
+                changed.append(key)
+                renamed = renamed or old_values[:3] != new_values[:3]
+
+        self.entries = fresh
+        if added or removed or renamed:
+            self.build_index()
+        self.sort()
+        return added, removed, changed
+
+    def build_index(self):
+        """Map every prefix of every token to the keys of the locations containing it"""
+        index = {}
+        for key, entry in self.entries.items():
+            for token in entry.tokens():
+                for end in range(1, len(token) + 1):
+                    index.setdefault(token[:end], set()).add(key)
+        self.prefix_index = index
+
+    def search(self, query):
+        """Return the set of keys matching query, or None when the query is empty.
+
+        Every whitespace-separated term must prefix-match a token; if that finds
+        nothing, fall back to a plain substring match like the old search did.
+        """
+        query = query.casefold().strip()
+        if not query:
+            return None
+        match = self.prefix_index.get(query)
+        if match is not None:
+            return match
+        matches = None
+        for term in query.split():
+            keys = self.prefix_index.get(term)
+            if not keys:
+                matches = None
+                break
+            matches = keys if matches is None else matches & keys
+        if matches:
+            return matches
+        return {key for key, entry in self.entries.items() if query in entry.haystack}
+
+    def toggle_sort(self, column):
+        """Sort by column, flipping direction if it is already the sort column"""
+        if column == self.sort_column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = column
+            self.descending = False
+        return self.sort()
+
+    def sort(self):
+        column = self.sort_column
+        # Ties fall back to country and city so the order is stable across refreshes
+        self.order = sorted(
+            self.entries,
+            key=lambda key: (self.entries[key].sort_keys[column],
+                             self.entries[key].sort_keys["country"],
+                             self.entries[key].sort_keys["city"]),
+            reverse=self.descending
+        )
+        return self.order
+
+    def visible_order(self, matches):
+        """Current sort order restricted to matches (all rows when matches is None)"""
+        if matches is None:
+            return list(self.order)
+        return [key for key in self.order if key in matches]
@@ -0,0 +1,156 @@
+"""Connection quality probing through the active tunnel.
+
+Each round opens a TCP connection to every target at once and records the
+connect time. In TUN mode the socket is bound to the tunnel interface when
+permitted; in SOCKS mode the time is that of the proxy's CONNECT to the
+target. Round trip times, with NaN for a lost probe, go into a fixed-size
+ring per target, from which percentiles, jitter and loss are computed.
+"""
+import asyncio
+import math
+import socket
+import struct
+import time
+
+from app_env import list_from_env
+from throughput import RingBuffer
+
+
+DEFAULT_TARGETS = ("1.1.1.1:443", "8.8.8.8:443", "9.9.9.9:443")
+# Space or comma separated host:port pairs that replace DEFAULT_TARGETS
+TARGETS_ENV = "ADGUARD_VPN_GUI_PROBE_TARGETS"
+PROBE_TIMEOUT = 3.0
+WINDOW = 120
+
+
+def split_target(target):
+    """Split "host:port" or "[v6]:port" into (host, port)"""
+    host, _, port = target.rpartition(":")
+    return host.strip("[]"), int(port)
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted, non-empty list"""
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+async def tcp_connect_rtt(host, port, interface=None, timeout=PROBE_TIMEOUT):
+    """Return the seconds a TCP connect to host:port takes"""
+    loop = asyncio.get_running_loop()
+    family, kind, proto, _, address = (await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM))[0]
+    with socket.socket(family, kind, proto) as sock:
+        sock.setblocking(False)
+        if interface and hasattr(socket, "SO_BINDTODEVICE"):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.encode())
+            except PermissionError:
+                # Without CAP_NET_RAW the routing table decides, which in TUN mode is the tunnel
+                pass
+        start = time.monotonic()
+        await asyncio.wait_for(loop.sock_connect(sock, address), timeout)
+        return time.monotonic() - start
+
+
+async def socks_connect_rtt(proxy_host, proxy_port, host, port, timeout=PROBE_TIMEOUT):
+    """Return the seconds a SOCKS5 proxy takes to CONNECT to host:port"""
+    async def handshake():
+        reader, writer = await asyncio.open_connection(proxy_host, proxy_port)
+        try:
+            writer.write(b"\x05\x01\x00")
+            if await reader.readexactly(2) != b"\x05\x00":
+                raise OSError("SOCKS proxy refused the connection")
+            encoded = host.encode("idna")
+            writer.write(b"\x05\x01\x00\x03" + bytes([len(encoded)]) + encoded + struct.pack("!H", port))
+            start = time.monotonic()
+            reply = await reader.readexactly(4)
+            elapsed = time.monotonic() - start
+            if reply[1] != 0:
+                raise OSError(f"SOCKS CONNECT failed with code {reply[1]}")
+            return elapsed
+        finally:
+            writer.close()
+
+    return await asyncio.wait_for(handshake(), timeout)
+
+
+class QualityMonitor:
+    """Probes targets in rounds and keeps the last WINDOW results of each.
+
+    Set interface for TUN mode, or socks to (host, port) for SOCKS mode,
+    then run probe_round() on an event loop as often as wanted.
+    """
+
+    def __init__(self, targets=None, window=WINDOW, timeout=PROBE_TIMEOUT):
+        self.targets = tuple(targets) if targets else list_from_env(TARGETS_ENV, DEFAULT_TARGETS)
+        self.timeout = timeout
+        self.samples = {target: RingBuffer(window) for target in self.targets}
+        self.interface = None
+        self.socks = None
+        self.rounds = 0
+        self._generation = 0
+
+    def reset(self, interface=None, socks=None):
+        self.interface = interface
+        self.socks = socks
+        self._generation += 1
+        for ring in self.samples.values():
+            ring.clear()
+
+    async def probe(self, target):
+        host, port = split_target(target)
+        try:
+            if self.socks:
+                return await socks_connect_rtt(self.socks[0], self.socks[1], host, port, self.timeout)
+            return await tcp_connect_rtt(host, port, self.interface, self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            return math.nan
+
+    async def probe_round(self):
+        """Probe every target concurrently and record the results"""
+        generation = self._generation
+        results = await asyncio.gather(*(self.probe(target) for target in self.targets))
+        if generation != self._generation:
+            # reset() was called meanwhile; these results belong to the old path
+            return results
+        for target, rtt in zip(self.targets, results):
+            self.samples[target].append(rtt * 1000)
+        self.rounds += 1
+        return results
+
+    def summary(self):
+        """Return {"p50", "p90", "p99", "jitter", "loss", "count"} over the window, or None"""
+        ok = []
+        count = 0
+        jitters = []
+        for ring in self.samples.values():
+            values = ring.values()
+            count += len(values)
+            answered = [value for value in values if not math.isnan(value)]
+            ok += answered
+            if len(answered) > 1:
+                # Mean difference between consecutive answers from one target, as in RFC 3550
+                jitters.append(sum(abs(b - a) for a, b in zip(answered, answered[1:])) / (len(answered) - 1))
+        if not count:
+            return None
+        loss = 1 - len(ok) / count
+        if not ok:
+            return {"p50": None, "p90": None, "p99": None, "jitter": None, "loss": loss, "count": count}
+        ordered = sorted(ok)
+        return {
+            "p50": percentile(ordered, 0.5),
+            "p90": percentile(ordered, 0.9),
+            "p99": percentile(ordered, 0.99),
+            "jitter": sum(jitters) / len(jitters) if jitters else 0.0,
+            "loss": loss,
+            "count": count,
+        }
+
+
+def format_summary(summary):
+    if summary is None:
+        return "Measuring..."
+    if summary["p50"] is None:
+        return f"No response ({summary['loss']:.0%} loss)"
+    return (f"RTT {summary['p50']:.0f} / {summary['p90']:.0f} / {summary['p99']:.0f} ms (p50/p90/p99), "
+            f"jitter {summary['jitter']:.1f} ms, loss {summary['loss']:.0%}")
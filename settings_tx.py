@@ -0,0 +1,215 @@
+"""Validation and transactional application of CLI settings.
+
+Only keys that differ from the loaded configuration are applied. Keys in
+different groups are applied concurrently, keys within a group in order.
+If any key fails, the keys that were applied are set back to their
+previous values, each group in the reverse of the order it was applied.
+"""
+import re
+from urllib.parse import urlsplit
+
+from addresses import is_ip
+
+
+# key -> (label, config subcommand)
+SETTINGS = {
+    "mode": ("VPN mode", "set-mode"),
+    "socks_port": ("SOCKS port", "set-socks-port"),
+    "socks_host": ("SOCKS host", "set-socks-host"),
+    "dns": ("DNS server", "set-dns"),
+    "update_channel": ("Update channel", "set-update-channel"),
+}
+
+# Keys in the same group depend on each other and are applied sequentially
+GROUPS = (
+    ("mode", "socks_host", "socks_port"),
+    ("dns",),
+    ("update_channel",),
+)
+
+MODES = ("TUN", "SOCKS")
+UPDATE_CHANNELS = ("release", "beta", "nightly")
+DNS_SCHEMES = ("udp", "tcp", "tls", "https", "quic", "h3", "sdns")
+HOSTNAME = re.compile(r'^(?=.{1,253}$)(?!-)[A-Za-z0-9-]{1,63}(?<!-)(?:\.(?!-)[A-Za-z0-9-]{1,63}(?<!-))*\.?$')
+
+APPLIED = "applied"
+FAILED = "failed"
+ROLLED_BACK = "rolled back"
+ROLLBACK_FAILED = "rollback failed"
+NOT_RUN = "not applied"
+
+
+def is_host(value):
+    return is_ip(value) or bool(HOSTNAME.match(value))
+
+
+def validate_port(value):
+    if not value.isdigit() or not 1 <= int(value) <= 65535:
+        return "must be a number between 1 and 65535"
+    return None
+
+
+def validate_host(value):
+    if not is_host(value):
+        return "must be an IP address or host name"
+    return None
+
+
+def validate_dns(value):
+    if value == "default" or is_ip(value):
+        return None
+    if "://" not in value:
+        # Plain IPv4 with a port, or a bracketed IPv6 address with a port
+        value = "udp://" + value
+    try:
+        parts = urlsplit(value)
+        parts.port
+    except ValueError:
+        return "has an invalid port"
+    if parts.scheme not in DNS_SCHEMES:
+        return f"must use one of: {', '.join(DNS_SCHEMES)}"
+    if parts.scheme == "sdns":
+        return None if parts.netloc else "is not a valid DNS stamp"
+    if not parts.hostname or not is_host(parts.hostname):
+        return "must name a valid server"
+    return None
+
+
+def validate_choice(choices):
+    def validate(value):
+        if value not in choices:
+            return f"must be one of: {', '.join(choices)}"
+        return None
+    return validate
+
+
+VALIDATORS = {
+    "mode": validate_choice(MODES),
+    "socks_port": validate_port,
+    "socks_host": validate_host,
+    "dns": validate_dns,
+    "update_channel": validate_choice(UPDATE_CHANNELS),
+}
+
+
+def validate(desired):
+    """Return {key: error message} for every invalid value"""
+    errors = {}
+    for key, value in desired.items():
+        error = VALIDATORS[key](value)
+        if error:
+            errors[key] = f"{SETTINGS[key][0]} {error}"
+    return errors
+
+
+def diff(baseline, desired):
+    """Return the keys whose desired value differs from the baseline, in SETTINGS order"""
+    return [key for key in SETTINGS
+            if key in desired and (baseline is None or getattr(baseline, key) != desired[key])]
+
+
+def set_command(key, value):
+    return ["config", SETTINGS[key][1], value]
+
+
+class SettingsTransaction:
+    """Applies changed settings through run(args, callback), where callback
+    receives a CommandResult. Calls on_done(results) once everything,
+    including any rollback, has finished. results maps key to
+    (outcome, detail).
+    """
+
+    def __init__(self, run, baseline, desired, on_done):
+        self.run = run
+        self.baseline = baseline
+        self.desired = desired
+        self.on_done = on_done
+        self.keys = diff(baseline, desired)
+        self.results = {key: (NOT_RUN, "") for key in self.keys}
+        self._pending_groups = 0
+        self._pending_rollbacks = 0
+
+    def start(self):
+        if not self.keys:
+            self.on_done(self.results)
+            return
+        groups = [[key for key in group if key in self.keys] for group in GROUPS]
+        groups = [group for group in groups if group]
+        self._pending_groups = len(groups)
+        for group in groups:
+            self._apply_next(group, 0)
+
+    def _apply_next(self, group, index):
+        if index == len(group):
+            self._group_finished()
+            return
+        key = group[index]
+
+        def finished(result):
+            if result.ok:
+                self.results[key] = (APPLIED, "")
+                self._apply_next(group, index + 1)
+            else:
+                self.results[key] = (FAILED, (result.stderr or result.stdout).strip())
+                # Later keys in this group depend on this one, so stop here
+                self._group_finished()
+
+        self.run(set_command(key, self.desired[key]), finished)
+
+    def _group_finished(self):
+        self._pending_groups -= 1
+        if self._pending_groups:
+            return
+        if any(outcome == FAILED for outcome, _ in self.results.values()):
+            self._rollback()
+        else:
+            self.on_done(self.results)
+
+    def _rollback(self):
+        groups = []
+        for group in GROUPS:
+            applied = []
+            for key in group:
+                if self.results.get(key, (None,))[0] != APPLIED:
+                    continue
+                if self.baseline is None or not getattr(self.baseline, key):
+                    self.results[key] = (ROLLBACK_FAILED, "previous value unknown")
+                else:
+                    applied.append(key)
+            if applied:
+                # Undo dependent keys in reverse, e.g. the SOCKS host before the mode
+                groups.append(applied[::-1])
+        if not groups:
+            self.on_done(self.results)
+            return
+
+        self._pending_rollbacks = len(groups)
+        for group in groups:
+            self._rollback_next(group, 0)
+
+    def _rollback_next(self, group, index):
+        if index == len(group):
+            self._pending_rollbacks -= 1
+            if not self._pending_rollbacks:
+                self.on_done(self.results)
+            return
+        key = group[index]
+
+        def finished(result):
+            if result.ok:
+                self.results[key] = (ROLLED_BACK, "")
+            else:
+                self.results[key] = (ROLLBACK_FAILED, (result.stderr or result.stdout).strip())
+            self._rollback_next(group, index + 1)
+
+        self.run(set_command(key, getattr(self.baseline, key)), finished)
+
+
+def format_report(results):
+    lines = []
+    for key, (outcome, detail) in results.items():
+        line = f"{SETTINGS[key][0]}: {outcome}"
+        if detail:
+            line += f" ({detail})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,64 @@
+"""Persisted snapshot of the last known UI state.
+
+The window renders from this at startup, before any CLI call has returned,
+and every piece is then reconciled in the background.
+"""
+import json
+import os
+import tempfile
+import time
+
+from app_env import cache_dir
+
+
+SNAPSHOT_VERSION = 1
+
+
+class StateSnapshot:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir(), "state.json")
+        self.data = {}
+        self.dirty = False
+
+    def load(self):
+        """Read the snapshot, returning an empty dict if it is missing or unreadable"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            return {}
+        self.data = data.get("sections", {})
+        return self.data
+
+    def get(self, section, default=None):
+        return self.data.get(section, default)
+
+    def update(self, section, value):
+        """Store a section, returning True if it actually changed"""
+        if self.data.get(section) == value:
+            return False
+        self.data[section] = value
+        self.dirty = True
+        return True
+
+    def save(self):
+        """Write the snapshot atomically via a temporary file and rename"""
+        if not self.dirty:
+            return
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        payload = {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "sections": self.data}
+        fd, tmp_path = tempfile.mkstemp(prefix=".state-", suffix=".json", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.dirty = False
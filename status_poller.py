@@ -0,0 +1,128 @@
+import time
+
+
+class StatusPoller:
+    """Schedules status polls so that at most one is ever in flight.
+
+    poll_fn is called with a done callback and must call it exactly once with
+    a hashable state once the poll finishes. While the reported state stays
+    the same the interval grows exponentially up to max_interval; any change,
+    or a call to boost(), drops back to fast polling.
+    """
+
+    def __init__(self, root, poll_fn, min_interval=2000, max_interval=30000,
+                 backoff=2.0, fast_interval=500, fast_polls=6):
+        self.root = root
+        self.poll_fn = poll_fn
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.fast_interval = fast_interval
+        self.fast_polls = fast_polls
+
+        self.interval = min_interval
+        self.running = False
+        self.in_flight = False
+        self.last_state = None
+        self._fast_remaining = 0
+        self._pending = None
+        self._rerun = False
+        self._started_at = 0.0
+
+        # Statistics
+        self.polls = 0
+        self.skipped_ticks = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    def start(self):
+        """Start polling, or poll now if already running"""
+        if self.running:
+            self.request_now()
+            return
+        self.running = True
+        self._schedule(0)
+
+    def stop(self):
+        self.running = False
+        self._cancel()
+
+    def request_now(self):
+        """Poll as soon as possible without overlapping a poll in flight"""
+        if not self.running:
+            return
+        if self.in_flight:
+            self.skipped_ticks += 1
+            self._rerun = True
+            return
+        self._schedule(0)
+
+    def boost(self):
+        """Poll quickly for a while, e.g. right after connect or disconnect"""
+        self._fast_remaining = self.fast_polls
+        self.interval = self.fast_interval
+        self.request_now()
+
+    def _schedule(self, delay):
+        self._cancel()
+        self._pending = self.root.after(delay, self._tick)
+
+    def _cancel(self):
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+            self._pending = None
+
+    def _tick(self):
+        self._pending = None
+        if not self.running:
+            return
+        if self.in_flight:
+            self.skipped_ticks += 1
+            return
+        self.in_flight = True
+        self._started_at = time.monotonic()
+        try:
+            self.poll_fn(self._finished)
+        except Exception:
+            self._finished(None)
+            raise
+
+    def _finished(self, state):
+        latency = time.monotonic() - self._started_at
+        self.in_flight = False
+        self.polls += 1
+        self.last_latency = latency
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+        if self._fast_remaining > 0:
+            self._fast_remaining -= 1
+            self.interval = self.fast_interval
+        elif state != self.last_state:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, max(self.min_interval, self.interval * self.backoff))
+        self.last_state = state
+
+        if not self.running:
+            return
+        if self._rerun:
+            self._rerun = False
+            self._schedule(0)
+        else:
+            self._schedule(int(self.interval))
+
+    @property
+    def boosted(self):
+        """True while the fast polls requested by boost() are still running"""
+        return self._fast_remaining > 0
+
+    @property
+    def average_latency(self):
+        return self.total_latency / self.polls if self.polls else 0.0
+
+    def stats_summary(self):
+        return (f"{self.polls} polls, avg latency {self.average_latency * 1000:.0f} ms, "
+                f"max {self.max_latency * 1000:.0f} ms, {self.skipped_ticks} skipped ticks, "
+                f"next in {int(self.interval)} ms")
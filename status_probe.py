@@ -0,0 +1,98 @@
+"""Tiered liveness check in front of the CLI status call.
+
+Tier 0 reads the tunnel interface state from sysfs and checks in /proc
+that the CLI daemon is still alive, which costs a few file reads and no
+process. Tier 1, the `status` command, only runs when tier 0 sees a
+change, when the last CLI answer is older than max_staleness, or after
+invalidate().
+"""
+import os
+import time
+
+import linux_introspect
+
+
+class TieredStatusProbe:
+    def __init__(self, executable, max_staleness=30.0, clock=time.monotonic):
+        self.executable = executable
+        self.max_staleness = max_staleness
+        self.clock = clock
+        self.available = os.path.isdir(linux_introspect.PROC)
+        self._confirmed = None
+        self._confirmed_at = None
+        self._daemon_pid = None
+        self._daemon_argv0 = None
+
+        # Statistics
+        self.tier0_checks = 0
+        self.tier0_changes = 0
+        self.tier1_runs = 0
+        self.tier1_skipped = 0
+        self.stale_runs = 0
+
+    def invalidate(self):
+        """Make the next check run the CLI, e.g. after a user action"""
+        self._confirmed_at = None
+
+    def interface_state(self, interface):
+        if not interface:
+            return None
+        try:
+            with open(os.path.join(linux_introspect.SYS_CLASS_NET, interface, "operstate")) as f:
+                return f.read().strip()
+        except OSError:
+            return "missing"
+
+    def daemon_running(self):
+        # The pid found last time is usually still the daemon; only rescan /proc when it is gone
+        pid = self._daemon_pid
+        if pid is not None:
+            try:
+                state, _ = linux_introspect.read_stat(str(pid))
+                if state != "Z" and linux_introspect.read_cmdline(str(pid))[0] == self._daemon_argv0:
+                    return True
+            except (OSError, ValueError, IndexError):
+                pass
+        pids = linux_introspect.find_processes(self.executable, exclude_parent=os.getpid())
+        self._daemon_pid = pids[0] if pids else None
+        if pids:
+            self._daemon_argv0 = linux_introspect.read_cmdline(str(pids[0]))[0]
+        return bool(pids)
+
+    def fingerprint(self, interface):
+        return (interface, self.interface_state(interface), self.daemon_running())
+
+    def needs_cli(self, interface):
+        """Run tier 0 and return True if the CLI status has to be asked (tier 1)"""
+        if not self.available:
+            self.tier1_runs += 1
+            return True
+        self.tier0_checks += 1
+        try:
+            current = self.fingerprint(interface)
+        except (OSError, ValueError, IndexError):
+            current = None
+        if current != self._confirmed:
+            self.tier0_changes += 1
+        elif self._confirmed_at is not None and self.clock() - self._confirmed_at < self.max_staleness:
+            self.tier1_skipped += 1
+            return False
+        elif self._confirmed_at is not None:
+            self.stale_runs += 1
+        self.tier1_runs += 1
+        return True
+
+    def confirmed(self, interface):
+        """Record the tier 0 view after a CLI status answer naming interface (or None)"""
+        if not self.available:
+            return
+        try:
+            self._confirmed = self.fingerprint(interface)
+        except (OSError, ValueError, IndexError):
+            self._confirmed = None
+        self._confirmed_at = self.clock()
+
+    def stats_summary(self):
+        return (f"tier 0: {self.tier0_checks} checks, {self.tier0_changes} changes; "
+                f"tier 1: {self.tier1_runs} CLI runs ({self.stale_runs} for staleness), "
+                f"{self.tier1_skipped} avoided")
@@ -0,0 +1,111 @@
+import pytest
+
+from exclusion_set import PLAIN_COVERS_ENV, DomainTrie, ExclusionPlan, normalize
+
+
+@pytest.mark.parametrize("entry, expected", [
+    ("EXAMPLE.com/", "example.com"),
+    ("HTTPS://Example.com/", "example.com"),
+    ("https://example.com", "example.com"),
+    ("example.com.", "example.com"),
+    ("*.Example.com", "*.example.com"),
+    ("bücher.de", "xn--bcher-kva.de"),
+    ("192.168.1.1", "192.168.1.1"),
+    ("[2001:db8::1]", "2001:db8::1"),
+    ("2001:db8::1", "2001:db8::1"),
+    ("", None),
+    ("not a domain", None),
+    ("-bad.example.com", None),
+    ("a" * 64 + ".com", None),
+])
+def test_normalize(entry, expected):
+    assert normalize(entry) == expected
+
+
+@pytest.mark.parametrize("entry", [
+    # Rewriting these would widen or narrow the traffic they match
+    "192.168.0.0/16",
+    "2001:db8::/32",
+    "example.com/app",
+    "https://example.com/app/",
+    "example.com?q=1",
+    "example.com:8443",
+    "https://example.com:443",
+    "[2001:db8::1]:443",
+    "example.com:http",
+    "user@example.com",
+])
+def test_normalize_rejects_entries_it_cannot_rewrite_safely(entry):
+    assert normalize(entry) is None
+
+
+def test_wildcard_covers_subdomains_but_not_apex():
+    trie = DomainTrie(["*.example.com"])
+    assert trie.covering("www.example.com") == "*.example.com"
+    assert trie.covering("a.b.example.com") == "*.example.com"
+    assert trie.covering("*.www.example.com") == "*.example.com"
+    assert trie.covering("example.com") is None
+    assert trie.covering("notexample.com") is None
+
+
+def test_plain_entries_cover_nothing_by_default():
+    trie = DomainTrie(["example.com"])
+    assert trie.covering("www.example.com") is None
+    assert trie.covering("*.example.com") is None
+
+
+def test_plain_entries_cover_subdomains_when_opted_in():
+    trie = DomainTrie(["example.com"], plain_covers_subdomains=True)
+    assert trie.covering("www.example.com") == "example.com"
+    assert trie.covering("*.example.com") == "example.com"
+    assert trie.covering("example.org") is None
+
+
+def test_plan_conservative_keeps_subdomains_of_plain_entries(monkeypatch):
+    monkeypatch.delenv(PLAIN_COVERS_ENV, raising=False)
+    plan = ExclusionPlan(["example.com", "www.example.com", "*.example.org", "mail.example.org"])
+    assert plan.keep == ["example.com", "www.example.com", "*.example.org"]
+    assert plan.covered == {"mail.example.org": "*.example.org"}
+    assert plan.remove == ["mail.example.org"]
+    assert plan.add == []
+
+
+def test_plan_opt_in_folds_subdomains_into_plain_entries():
+    plan = ExclusionPlan(["example.com", "www.example.com", "*.example.com"], plain_covers_subdomains=True)
+    assert plan.keep == ["example.com"]
+    assert plan.covered == {"www.example.com": "example.com", "*.example.com": "example.com"}
+
+
+def test_plan_opt_in_from_environment(monkeypatch):
+    monkeypatch.setenv(PLAIN_COVERS_ENV, "1")
+    assert ExclusionPlan(["example.com", "www.example.com"]).keep == ["example.com"]
+
+
+def test_plan_rewrites_and_deduplicates():
+    plan = ExclusionPlan(["Example.com/", "example.com", "WWW.example.org", "*.example.org"])
+    assert plan.keep == ["example.com", "*.example.org"]
+    assert plan.rewritten == {"Example.com/": "example.com", "WWW.example.org": "www.example.org"}
+    assert plan.covered == {"Example.com/": "example.com", "WWW.example.org": "*.example.org"}
+    assert plan.remove == ["Example.com/", "WWW.example.org"]
+    assert plan.add == []
+
+
+def test_plan_duplicate_of_covered_entry_points_at_final_cover():
+    plan = ExclusionPlan(["*.example.com", "www.example.com", "WWW.example.com"])
+    assert plan.covered["WWW.example.com"] == "*.example.com"
+
+
+def test_plan_leaves_invalid_entries_and_addresses_alone():
+    plan = ExclusionPlan(["not a domain", "10.0.0.1", "*.example.com"])
+    assert plan.invalid == ["not a domain"]
+    assert plan.keep == ["10.0.0.1", "*.example.com"]
+    assert not plan.changed
+
+
+def test_plan_leaves_ranges_paths_and_ports_untouched():
+    entries = ["192.168.0.0/16", "example.com/app", "example.com:8443", "Example.org/"]
+    plan = ExclusionPlan(entries)
+    assert plan.invalid == ["192.168.0.0/16", "example.com/app", "example.com:8443"]
+    assert plan.keep == ["example.org"]
+    assert plan.remove == ["Example.org/"]
+    assert plan.add == ["example.org"]
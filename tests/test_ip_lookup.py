@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from ip_lookup import PublicIPLookup, decode_http_response, parse_ip_response
+
+
+def response(body, status="200 OK", chunked=False):
+    if chunked:
+        middle = len(body) // 2
+        payload = b"".join(b"%x\r\n%s\r\n" % (len(part), part) for part in (body[:middle], body[middle:]))
+        return (f"HTTP/1.1 {status}\r\nTransfer-Encoding: chunked\r\n\r\n").encode() + payload + b"0\r\n\r\n"
+    return f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+
+
+async def serve(reply, hangups=None):
+    """Start a local HTTP stand-in server.
+
+    With hangups set, the server never answers and instead counts the
+    clients that close the connection while waiting.
+    """
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        if hangups is not None:
+            await reader.read()
+            hangups.append(True)
+        else:
+            writer.write(reply)
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/ip"
+
+
+@pytest.mark.parametrize("body, expected", [
+    (b'{"ip": "203.0.113.7"}', "203.0.113.7"),
+    (b'{"origin": "203.0.113.7, 10.0.0.1"}', "203.0.113.7"),
+    (b"2001:db8::1\n", "2001:db8::1"),
+    (b"<html>blocked</html>", None),
+    (b'{"ip": 12}', None),
+])
+def test_parse_ip_response(body, expected):
+    assert parse_ip_response(body) == expected
+
+
+def test_decode_chunked_and_error_responses():
+    assert decode_http_response(response(b'{"ip": "203.0.113.7"}', chunked=True)) == b'{"ip": "203.0.113.7"}'
+    assert decode_http_response(response(b"nope", status="404 Not Found")) is None
+
+
+def test_fastest_endpoint_wins_and_slower_ones_are_cancelled():
+    async def scenario():
+        hangups = []
+        slow, slow_url = await serve(None, hangups)
+        fast, fast_url = await serve(response(b'{"ip": "203.0.113.7"}', chunked=True))
+        lookup = PublicIPLookup([slow_url, fast_url], stagger=0.05, timeout=10)
+        start = time.monotonic()
+        result = await lookup.race()
+        elapsed = time.monotonic() - start
+        # Give the slow server a moment to see the cancelled request hang up
+        for _ in range(50):
+            if hangups:
+                break
+            await asyncio.sleep(0.01)
+        slow.close()
+        fast.close()
+        return result, fast_url, elapsed, hangups, lookup.stats[slow_url], lookup.stats[fast_url]
+
+    (ip, url), fast_url, elapsed, hangups, slow_stats, fast_stats = asyncio.run(scenario())
+    assert (ip, url) == ("203.0.113.7", fast_url)
+    assert fast_stats.wins == 1
+    assert elapsed < 2
+    assert slow_stats.cancelled == 1 and slow_stats.wins == 0
+    assert hangups == [True]
+
+
+def test_failed_endpoint_starts_the_next_without_waiting_for_the_stagger():
+    async def scenario():
+        broken, broken_url = await serve(response(b"nope", status="500 Internal Server Error"))
+        good, good_url = await serve(response(b"203.0.113.7"))
+        lookup = PublicIPLookup([broken_url, good_url], stagger=5, timeout=10)
+        start = time.monotonic()
+        result = await lookup.race()
+        elapsed = time.monotonic() - start
+        broken.close()
+        good.close()
+        return result, elapsed, lookup.stats[broken_url]
+
+    (ip, _), elapsed, broken_stats = asyncio.run(scenario())
+    assert ip == "203.0.113.7"
+    assert elapsed < 2
+    assert broken_stats.failures == 1
+
+
+def test_no_valid_answer():
+    async def scenario():
+        server, url = await serve(response(b"not an address"))
+        lookup = PublicIPLookup([url, "http://127.0.0.1:1/"], stagger=0.05, timeout=2)
+        result = await lookup.race()
+        server.close()
+        return result
+
+    assert asyncio.run(scenario()) == (None, None)
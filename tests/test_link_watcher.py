@@ -0,0 +1,85 @@
+import socket
+import struct
+
+from link_watcher import (IFF_LOWER_UP, IFF_UP, IFINFOMSG, IFLA_IFNAME, RTA_OIF, RTM_DELLINK,
+                          RTM_DELROUTE, RTM_NEWLINK, RTM_NEWROUTE, RTMSG, LinkWatcher)
+from linux_introspect import NLMSG_HEADER, RTATTR_HEADER, align
+
+
+def attribute(attr_type, value):
+    data = RTATTR_HEADER.pack(RTATTR_HEADER.size + len(value), attr_type) + value
+    return data + bytes(align(len(data)) - len(data))
+
+
+def message(msg_type, body):
+    data = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), msg_type, 0, 0, 0) + body
+    return data + bytes(align(len(data)) - len(data))
+
+
+def link(msg_type, index, flags, name=None):
+    body = IFINFOMSG.pack(socket.AF_UNSPEC, 0, index, flags, 0)
+    if name is not None:
+        body += attribute(IFLA_IFNAME, name.encode() + b"\0")
+    return message(msg_type, body)
+
+
+def route(msg_type, dst_len, oif=None):
+    body = RTMSG.pack(socket.AF_INET, dst_len, 0, 0, 254, 0, 0, 1, 0)
+    if oif is not None:
+        body += attribute(RTA_OIF, struct.pack("=I", oif))
+    return message(msg_type, body)
+
+
+def kinds(events):
+    return [(event.kind, event.interface) for event in events]
+
+
+UP = IFF_UP | IFF_LOWER_UP
+
+
+def test_link_state_changes_are_reported_once():
+    watcher = LinkWatcher(None)
+    assert kinds(watcher.handle(link(RTM_NEWLINK, 7, UP, "tun0"))) == [("up", "tun0")]
+    # Flag churn without a state change is ignored
+    assert watcher.handle(link(RTM_NEWLINK, 7, UP, "tun0")) == []
+    assert kinds(watcher.handle(link(RTM_NEWLINK, 7, IFF_UP, "tun0"))) == [("down", "tun0")]
+
+
+def test_removed_link_uses_the_remembered_name():
+    watcher = LinkWatcher(None)
+    watcher.handle(link(RTM_NEWLINK, 7, UP, "tun0"))
+    assert kinds(watcher.handle(link(RTM_DELLINK, 7, 0))) == [("removed", "tun0")]
+    assert "tun0" not in watcher.links
+    # Unknown index without a name cannot be reported
+    assert watcher.handle(link(RTM_DELLINK, 8, 0)) == []
+
+
+def test_only_default_routes_are_reported():
+    watcher = LinkWatcher(None)
+    watcher.handle(link(RTM_NEWLINK, 7, UP, "tun0"))
+    assert kinds(watcher.handle(route(RTM_NEWROUTE, 0, oif=7))) == [("route", "tun0")]
+    assert kinds(watcher.handle(route(RTM_DELROUTE, 0))) == [("route", None)]
+    assert watcher.handle(route(RTM_NEWROUTE, 24, oif=7)) == []
+
+
+def test_several_messages_in_one_batch():
+    watcher = LinkWatcher(None)
+    batch = link(RTM_NEWLINK, 3, UP, "eth0") + route(RTM_NEWROUTE, 0, oif=3) + message(99, b"")
+    assert kinds(watcher.handle(batch)) == [("up", "eth0"), ("route", "eth0")]
+
+
+def test_truncated_messages_are_ignored():
+    watcher = LinkWatcher(None)
+    assert watcher.handle(message(RTM_NEWLINK, b"\0" * 4)) == []
+    assert watcher.handle(b"\0" * 3) == []
+
+
+def test_socket_failure_is_reported_instead_of_raised(monkeypatch):
+    def denied(*args):
+        raise PermissionError("netlink denied")
+
+    errors = []
+    monkeypatch.setattr(socket, "socket", denied)
+    watcher = LinkWatcher(None, errors.append)
+    watcher._run()
+    assert [str(error) for error in errors] == ["netlink denied"]
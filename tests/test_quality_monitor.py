@@ -0,0 +1,131 @@
+import asyncio
+import math
+import socket
+import struct
+
+import pytest
+
+from quality_monitor import QualityMonitor, format_summary, percentile, split_target
+
+
+def closed_port():
+    """A local port with nothing listening on it"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def listener():
+    server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0)
+    return server, f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+
+async def socks_proxy(reply_code=0):
+    """Minimal SOCKS5 stand-in that answers CONNECT without connecting anywhere"""
+    requests = []
+
+    async def handle(reader, writer):
+        await reader.readexactly(3)
+        writer.write(b"\x05\x00")
+        header = await reader.readexactly(5)
+        host = await reader.readexactly(header[4])
+        port = struct.unpack("!H", await reader.readexactly(2))[0]
+        requests.append((host.decode(), port))
+        writer.write(bytes([5, reply_code, 0, 1]) + bytes(6))
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], requests
+
+
+def test_split_target():
+    assert split_target("1.1.1.1:443") == ("1.1.1.1", 443)
+    assert split_target("[2606:4700::1111]:443") == ("2606:4700::1111", 443)
+
+
+def test_percentile_is_nearest_rank():
+    ordered = list(range(1, 101))
+    assert percentile(ordered, 0.5) == 50
+    assert percentile(ordered, 0.99) == 99
+    assert percentile([7], 0.9) == 7
+
+
+def test_rtt_and_loss_against_a_listener_and_a_closed_port():
+    async def scenario():
+        server, target = await listener()
+        monitor = QualityMonitor([target, f"127.0.0.1:{closed_port()}"], timeout=1)
+        for _ in range(3):
+            results = await monitor.probe_round()
+        server.close()
+        return monitor, results
+
+    monitor, results = asyncio.run(scenario())
+    assert 0 <= results[0] < 1
+    assert math.isnan(results[1])
+    summary = monitor.summary()
+    assert summary["count"] == 6
+    assert summary["loss"] == pytest.approx(0.5)
+    assert 0 <= summary["p50"] <= summary["p90"] <= summary["p99"] < 1000
+    assert monitor.rounds == 3
+
+
+def test_socks_mode_times_the_proxy_connect():
+    async def scenario():
+        server, port, requests = await socks_proxy()
+        monitor = QualityMonitor(["example.com:443"], timeout=1)
+        monitor.reset(socks=("127.0.0.1", port))
+        results = await monitor.probe_round()
+        server.close()
+        return results, requests
+
+    results, requests = asyncio.run(scenario())
+    assert not math.isnan(results[0])
+    assert requests == [("example.com", 443)]
+
+
+def test_socks_connect_failure_counts_as_loss():
+    async def scenario():
+        server, port, _ = await socks_proxy(reply_code=5)
+        monitor = QualityMonitor(["example.com:443"], timeout=1)
+        monitor.reset(socks=("127.0.0.1", port))
+        await monitor.probe_round()
+        server.close()
+        return monitor.summary()
+
+    summary = asyncio.run(scenario())
+    assert summary["loss"] == 1 and summary["p50"] is None
+    assert format_summary(summary) == "No response (100% loss)"
+
+
+def test_jitter_is_per_target_and_skips_lost_probes():
+    monitor = QualityMonitor(["a:1", "b:1"])
+    for value in (10, 20, math.nan, 10):
+        monitor.samples["a:1"].append(value)
+    for value in (100, 100, 100):
+        monitor.samples["b:1"].append(value)
+    summary = monitor.summary()
+    # a: |20-10| and |10-20| average 10; b: no variation. Mixing the two would be far larger
+    assert summary["jitter"] == pytest.approx(5)
+    assert summary["loss"] == pytest.approx(1 / 7)
+    assert summary["count"] == 7
+
+
+def test_reset_discards_a_round_in_flight():
+    async def scenario():
+        server, target = await listener()
+        monitor = QualityMonitor([target], timeout=1)
+        pending = asyncio.ensure_future(monitor.probe_round())
+        await asyncio.sleep(0)
+        monitor.reset(interface="lo")
+        await pending
+        server.close()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert monitor.summary() is None and monitor.rounds == 0
+
+
+def test_empty_window_has_no_summary():
+    assert QualityMonitor(["a:1"]).summary() is None
+    assert format_summary(None) == "Measuring..."
@@ -0,0 +1,132 @@
+import pytest
+
+import settings_tx
+from cli_parser import ConfigSnapshot
+from command_engine import CommandResult
+
+
+BASELINE = ConfigSnapshot(mode="TUN", socks_port="1080", socks_host="127.0.0.1", dns="default",
+                          update_channel="release")
+
+
+class FakeCLI:
+    """Collects commands and answers them when told to, like the engine would"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self.pending = []
+
+    def run(self, args, callback):
+        self.calls.append(tuple(args))
+        self.pending.append((args, callback))
+
+    def answer_all(self):
+        while self.pending:
+            args, callback = self.pending.pop(0)
+            failed = tuple(args) in self.failing
+            callback(CommandResult(args, 1 if failed else 0, "", "refused" if failed else ""))
+
+
+def apply(desired, cli, baseline=BASELINE):
+    results = []
+    transaction = settings_tx.SettingsTransaction(cli.run, baseline, desired, results.append)
+    transaction.start()
+    cli.answer_all()
+    assert len(results) == 1
+    return transaction, results[0]
+
+
+@pytest.mark.parametrize("key, value", [
+    ("socks_port", "0"),
+    ("socks_port", "65536"),
+    ("socks_port", "80a"),
+    ("socks_host", "bad host"),
+    ("socks_host", "-example.com"),
+    ("dns", "ftp://1.1.1.1"),
+    ("dns", "tls://"),
+    ("dns", "1.1.1.1:99999"),
+    ("mode", "tun"),
+    ("update_channel", "stable"),
+])
+def test_invalid_values_are_reported(key, value):
+    errors = settings_tx.validate({key: value})
+    assert list(errors) == [key]
+    assert errors[key].startswith(settings_tx.SETTINGS[key][0])
+
+
+@pytest.mark.parametrize("key, value", [
+    ("socks_port", "65535"),
+    ("socks_host", "0.0.0.0"),
+    ("socks_host", "proxy.example.com"),
+    ("dns", "default"),
+    ("dns", "8.8.8.8"),
+    ("dns", "1.1.1.1:53"),
+    ("dns", "[2606:4700::1111]:53"),
+    ("dns", "https://dns.example.com/dns-query"),
+    ("dns", "sdns://AgcAAAAAAAAA"),
+    ("mode", "SOCKS"),
+    ("update_channel", "nightly"),
+])
+def test_valid_values_pass(key, value):
+    assert settings_tx.validate({key: value}) == {}
+
+
+def test_only_changed_keys_are_applied():
+    cli = FakeCLI()
+    transaction, results = apply({"mode": "TUN", "socks_port": "1081", "dns": "default"}, cli)
+    assert transaction.keys == ["socks_port"]
+    assert cli.calls == [("config", "set-socks-port", "1081")]
+    assert results == {"socks_port": (settings_tx.APPLIED, "")}
+
+
+def test_groups_run_concurrently_and_keys_within_a_group_in_order():
+    cli = FakeCLI()
+    desired = {"mode": "SOCKS", "socks_host": "0.0.0.0", "dns": "8.8.8.8", "update_channel": "beta"}
+    transaction = settings_tx.SettingsTransaction(cli.run, BASELINE, desired, lambda results: None)
+    transaction.start()
+    # The first key of every group is started before any answer arrives
+    assert cli.calls == [("config", "set-mode", "SOCKS"), ("config", "set-dns", "8.8.8.8"),
+                         ("config", "set-update-channel", "beta")]
+    cli.answer_all()
+    assert cli.calls[3:] == [("config", "set-socks-host", "0.0.0.0")]
+
+
+def test_failure_stops_the_group_and_rolls_back_in_reverse_order():
+    cli = FakeCLI(failing={("config", "set-socks-port", "2000")})
+    desired = {"mode": "SOCKS", "socks_host": "0.0.0.0", "socks_port": "2000", "dns": "8.8.8.8"}
+    _, results = apply(desired, cli)
+
+    rollbacks = cli.calls[cli.calls.index(("config", "set-socks-port", "2000")) + 1:]
+    group = [call for call in rollbacks if call[1] != "set-dns"]
+    assert group == [("config", "set-socks-host", "127.0.0.1"), ("config", "set-mode", "TUN")]
+    assert ("config", "set-dns", "default") in rollbacks
+    assert results == {
+        "mode": (settings_tx.ROLLED_BACK, ""),
+        "socks_port": (settings_tx.FAILED, "refused"),
+        "socks_host": (settings_tx.ROLLED_BACK, ""),
+        "dns": (settings_tx.ROLLED_BACK, ""),
+    }
+
+
+def test_keys_after_a_failure_are_not_run():
+    cli = FakeCLI(failing={("config", "set-mode", "SOCKS")})
+    _, results = apply({"mode": "SOCKS", "socks_host": "0.0.0.0"}, cli)
+    assert cli.calls == [("config", "set-mode", "SOCKS")]
+    assert results == {"mode": (settings_tx.FAILED, "refused"), "socks_host": (settings_tx.NOT_RUN, "")}
+
+
+def test_failed_rollback_is_reported_and_the_rest_still_reverts():
+    cli = FakeCLI(failing={("config", "set-update-channel", "beta"), ("config", "set-socks-host", "127.0.0.1")})
+    _, results = apply({"mode": "SOCKS", "socks_host": "0.0.0.0", "update_channel": "beta"}, cli)
+    assert results["socks_host"] == (settings_tx.ROLLBACK_FAILED, "refused")
+    assert results["mode"] == (settings_tx.ROLLED_BACK, "")
+    assert results["update_channel"] == (settings_tx.FAILED, "refused")
+
+
+def test_unknown_previous_value_cannot_be_rolled_back():
+    baseline = ConfigSnapshot(mode="TUN", dns="", update_channel="release")
+    cli = FakeCLI(failing={("config", "set-update-channel", "beta")})
+    _, results = apply({"dns": "8.8.8.8", "update_channel": "beta"}, cli, baseline)
+    assert results["dns"] == (settings_tx.ROLLBACK_FAILED, "previous value unknown")
+    assert ("config", "set-dns", "") not in cli.calls
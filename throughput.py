@@ -0,0 +1,144 @@
+"""Tunnel throughput sampling with constant-memory history.
+
+Byte counters are read from /sys/class/net/<iface>/statistics. Rates are
+kept at two resolutions in fixed-size array('d') rings: every sample for
+the last few minutes, and per-minute averages for the last 24 hours. The
+sparkline is drawn from a decimated copy, so memory and the number of
+canvas items stay the same however long the tunnel is up.
+"""
+import os
+import time
+from array import array
+
+from linux_introspect import SYS_CLASS_NET
+
+
+class RingBuffer:
+    """Fixed-capacity ring of floats"""
+    __slots__ = ("data", "start", "count")
+
+    def __init__(self, capacity):
+        self.data = array("d", bytes(8 * max(1, capacity)))
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        capacity = len(self.data)
+        if self.count < capacity:
+            self.data[(self.start + self.count) % capacity] = value
+            self.count += 1
+        else:
+            self.data[self.start] = value
+            self.start = (self.start + 1) % capacity
+
+    def values(self):
+        """Return the contents, oldest first"""
+        end = self.start + self.count
+        if end <= len(self.data):
+            return self.data[self.start:end]
+        return self.data[self.start:] + self.data[:end - len(self.data)]
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+
+
+def read_counters(interface):
+    """Return (rx_bytes, tx_bytes) of interface"""
+    path = os.path.join(SYS_CLASS_NET, interface, "statistics")
+    with open(os.path.join(path, "rx_bytes")) as rx, open(os.path.join(path, "tx_bytes")) as tx:
+        return int(rx.read()), int(tx.read())
+
+
+def decimate(values, points):
+    """Reduce values to at most points, keeping the peak of each bucket"""
+    count = len(values)
+    if count <= points:
+        return list(values)
+    step = count / points
+    return [max(values[int(i * step):max(int(i * step) + 1, int((i + 1) * step))]) for i in range(points)]
+
+
+def format_bytes(count, suffix=""):
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024:
+            return f"{count:.0f} {unit}{suffix}" if unit == "B" else f"{count:.1f} {unit}{suffix}"
+        count /= 1024
+    return f"{count:.1f} TB{suffix}"
+
+
+class ThroughputMeter:
+    """Samples an interface's byte counters and keeps rx/tx rate history.
+
+    recent holds one rate per sample for recent_span seconds; history holds
+    the average rate of each bucket seconds for history_span seconds.
+    """
+
+    def __init__(self, interval=1.0, recent_span=600, history_span=24 * 3600, bucket=60, clock=time.monotonic):
+        self.interval = interval
+        self.bucket = bucket
+        self.clock = clock
+        self.recent = (RingBuffer(int(recent_span / interval)), RingBuffer(int(recent_span / interval)))
+        self.history = (RingBuffer(history_span // bucket), RingBuffer(history_span // bucket))
+        self.interface = None
+        self.rx_total = 0
+        self.tx_total = 0
+        self.rx_rate = 0.0
+        self.tx_rate = 0.0
+        self._last = None
+        self._bucket_start = None
+        self._bucket_bytes = [0, 0]
+
+    def reset(self, interface):
+        """Start over for a new interface, e.g. after reconnecting"""
+        self.interface = interface
+        for ring in self.recent + self.history:
+            ring.clear()
+        self.rx_total = self.tx_total = 0
+        self.rx_rate = self.tx_rate = 0.0
+        self._last = None
+        self._bucket_start = None
+        self._bucket_bytes = [0, 0]
+
+    def sample(self):
+        """Read the counters and record the rates; return False if the interface is gone"""
+        if not self.interface:
+            return False
+        try:
+            rx, tx = read_counters(self.interface)
+        except (OSError, ValueError):
+            self._last = None
+            return False
+        now = self.clock()
+        self.rx_total, self.tx_total = rx, tx
+        last = self._last
+        self._last = (now, rx, tx)
+        if last is None or rx < last[1] or tx < last[2] or now <= last[0]:
+            # First sample, or the counters were reset: only set the baseline
+            self._bucket_start = now
+            return True
+
+        elapsed = now - last[0]
+        rx_bytes, tx_bytes = rx - last[1], tx - last[2]
+        self.rx_rate = rx_bytes / elapsed
+        self.tx_rate = tx_bytes / elapsed
+        self.recent[0].append(self.rx_rate)
+        self.recent[1].append(self.tx_rate)
+
+        self._bucket_bytes[0] += rx_bytes
+        self._bucket_bytes[1] += tx_bytes
+        span = now - self._bucket_start
+        if span >= self.bucket:
+            self.history[0].append(self._bucket_bytes[0] / span)
+            self.history[1].append(self._bucket_bytes[1] / span)
+            self._bucket_start = now
+            self._bucket_bytes = [0, 0]
+        return True
+
+    def series(self, long_term=False):
+        """Return (rx rates, tx rates), oldest first"""
+        rings = self.history if long_term else self.recent
+        return rings[0].values(), rings[1].values()
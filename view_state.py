@@ -0,0 +1,45 @@
+"""Central store for the state shown by the connection widgets.
+
+Worker threads never touch Tk. They queue callables that must run on the
+Tk thread on a SimpleQueue; the Tk thread drains it on a fixed tick, and
+those callables apply state changes with update(), so only the widgets
+whose fields changed are reconfigured.
+"""
+import queue
+
+
+class ViewState:
+    def __init__(self, **initial):
+        self.values = dict(initial)
+        self.dirty = set(initial)
+        self.queue = queue.SimpleQueue()
+
+    def get(self, field):
+        return self.values.get(field)
+
+    def call(self, func):
+        """Queue func to run on the Tk thread during the next drain"""
+        self.queue.put(func)
+
+    def update(self, **delta):
+        """Apply a state change on the Tk thread; widgets are refreshed on the next tick"""
+        for field, value in delta.items():
+            if self.values.get(field) != value:
+                self.values[field] = value
+                self.dirty.add(field)
+
+    def drain(self):
+        """Apply everything queued so far and return the set of fields that changed.
+
+        Items are taken one at a time, so if a callback opens a modal dialog
+        a drain from a nested tick carries on with the rest of the queue.
+        """
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            item()
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
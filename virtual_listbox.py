@@ -0,0 +1,124 @@
+"""A Listbox that only ever holds the rows currently in view.
+
+The rows come from any object with __len__ and window(start, count), such
+as ExclusionModel. Scrolling replaces the few visible rows instead of
+moving through a widget holding the whole list, so the cost of rendering
+does not depend on how long the list is. Selection is tracked by row value
+so Ctrl- and Shift-selections survive scrolling and filtering; a plain click
+replaces the whole selection, including rows out of view.
+"""
+import tkinter as tk
+import tkinter.font as tkfont
+
+
+# Event state bits for Shift and Control
+EXTEND_MODIFIERS = 0x1 | 0x4
+
+
+class VirtualListbox(tk.Frame):
+    def __init__(self, parent, rows, bg=None, **listbox_options):
+        super().__init__(parent, bg=bg)
+        self.rows = rows
+        self.top = 0
+        self.visible_rows = int(listbox_options.get("height", 10))
+        self.selected = set()
+        self.message = None
+        self._window = []
+        self._extend = False
+
+        self.listbox = tk.Listbox(self, selectmode=tk.EXTENDED, exportselection=False, **listbox_options)
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.listbox.bind("<Configure>", self.on_resize)
+        # Runs before the class binding that changes the selection
+        self.listbox.bind("<ButtonPress-1>", self.on_press)
+        self.listbox.bind("<KeyPress>", self.on_press)
+        self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1))
+        self.listbox.bind("<Button-4>", lambda event: self.scroll(-1))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll(1))
+
+    def on_resize(self, event):
+        row_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+        padding = 2 * (int(self.listbox.cget("borderwidth")) + int(self.listbox.cget("highlightthickness")))
+        rows = max(1, (event.height - padding) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
+
+    def on_press(self, event):
+        self._extend = bool(event.state & EXTEND_MODIFIERS)
+
+    def on_select(self, event=None):
+        if self.message is not None:
+            self.listbox.selection_clear(0, tk.END)
+            return
+        chosen = set(self.listbox.curselection())
+        if not self._extend:
+            self.selected = {row for index, row in enumerate(self._window) if index in chosen}
+            return
+        for index, row in enumerate(self._window):
+            if index in chosen:
+                self.selected.add(row)
+            else:
+                self.selected.discard(row)
+
+    def selection(self):
+        return sorted(self.selected)
+
+    def clear_selection(self):
+        self.selected.clear()
+        self.render()
+
+    def show_message(self, text):
+        """Replace the rows with a single informational line"""
+        self.message = text
+        self._window = []
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, text)
+        self.scrollbar.set(0, 1)
+
+    def refresh(self, keep_position=True):
+        """Render the current rows, after the source has changed"""
+        self.message = None
+        if not keep_position:
+            self.top = 0
+        self._window = None
+        self.render()
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", count, "units"/"pages")"""
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.render()
+
+    def scroll(self, units):
+        self.top += units * 3
+        self.render()
+        return "break"
+
+    def render(self):
+        if self.message is not None:
+            return
+        total = len(self.rows)
+        self.top = max(0, min(self.top, total - self.visible_rows))
+        window = self.rows.window(self.top, self.visible_rows)
+        if window != self._window:
+            self.listbox.delete(0, tk.END)
+            if window:
+                self.listbox.insert(tk.END, *window)
+            self._window = window
+        self.listbox.selection_clear(0, tk.END)
+        for index, row in enumerate(window):
+            if row in self.selected:
+                self.listbox.selection_set(index)
+
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0, 1)